@@ -0,0 +1,241 @@
+"""
+Headless-Benchmarks (SDL_VIDEODRIVER=dummy) für die heißen Pfade:
+
+  draw:<zustand>       Game.draw() komplett (invalidate vorher) in alive/dead/dialog/teen_idle3
+  draw:<zustand>:dirty Game.draw() mit nur einem geänderten Idle-Frame (der normale Frame)
+  update               Game.update() bei 33 ms pro Aufruf
+  robust_save, load_state
+  load_phase:<phase>   SpriteManager.load_phase ohne (cold) und mit Disk-Cache
+
+Pro Messung: Perzentile in µs, Peak der Python-Allokationen (tracemalloc) und netto
+zurückbehaltene Blöcke pro Aufruf. Allokationen in SDL selbst sieht tracemalloc nicht.
+
+    python3 bench.py --out bench.json
+    python3 bench.py --baseline bench_baseline.json   # Exit 1 bei Regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ["TAMAGO_RECORD"] = ""
+
+import pygame  # noqa: E402
+
+import main  # noqa: E402
+from engine import PHASES, GameState, VirtualClock  # noqa: E402
+
+FRAME_MS = 1000 // main.FPS
+# Regression erst, wenn p50 um mehr als --tolerance UND um mindestens so viel langsamer ist
+MIN_REGRESSION_US = 20.0
+
+
+def measure(
+    fn: Callable[[], None], iterations: int, setup: Optional[Callable[[], None]] = None
+) -> Dict[str, float]:
+    for _ in range(min(5, iterations)):  # Warm-up (Caches, erste Allokationen)
+        if setup is not None:
+            setup()
+        fn()
+
+    timings: List[float] = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        fn()
+        timings.append((time.perf_counter_ns() - start) / 1000)
+
+    # Allokationen in einem eigenen, kürzeren Durchlauf; tracemalloc verfälscht die Zeiten
+    alloc_runs = max(1, iterations // 10)
+    peak_bytes = blocks = 0
+    tracemalloc.start()
+    for _ in range(alloc_runs):
+        if setup is not None:
+            setup()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        blocks_before = sys.getallocatedblocks()
+        fn()
+        blocks += sys.getallocatedblocks() - blocks_before
+        peak_bytes += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    if len(timings) > 1:
+        cuts = statistics.quantiles(timings, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = timings[0]
+    return {
+        "n": iterations,
+        "p50_us": round(p50, 1),
+        "p95_us": round(p95, 1),
+        "p99_us": round(p99, 1),
+        "mean_us": round(statistics.fmean(timings), 1),
+        "max_us": round(max(timings), 1),
+        "alloc_peak_bytes": round(peak_bytes / alloc_runs),
+        "net_blocks": round(blocks / alloc_runs, 1),
+    }
+
+
+def make_game(state: GameState) -> "main.Game":
+    game = main.Game(main.ReplayBackend(state), VirtualClock(0), seed=1, started_at=0.0, record_path="")
+    game.shutdown_command = None
+    game.backlight = None
+    return game
+
+
+def dispose(game: "main.Game") -> None:
+    """Wie Game.close(), aber ohne pygame.quit(); die nächsten Benchmarks brauchen das Display noch."""
+    game.saver.close()
+    game.sprites.close()
+
+
+def bench_draw(iterations: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    states = {
+        "alive": dict(),
+        "dead": dict(dead=True, hunger=0, love=10),
+        "dialog": dict(),
+        "teen_idle3": dict(level=12, hunger=100),
+    }
+    for name, fields in states.items():
+        game = make_game(GameState(**fields))
+        if name == "dialog":
+            game.sim.say("FEED", 10**9)
+        game.draw()
+
+        results[f"draw:{name}"] = measure(game.draw, iterations, setup=game.invalidate)
+
+        def next_idle_frame(game: "main.Game" = game) -> None:
+            game.sim.frame_index = 1 - game.sim.frame_index
+
+        results[f"draw:{name}:dirty"] = measure(game.draw, iterations, setup=next_idle_frame)
+        dispose(game)
+    return results
+
+
+def bench_update(iterations: int) -> Dict[str, Dict[str, float]]:
+    game = make_game(GameState())
+
+    def advance() -> None:
+        game.ticks.advance(FRAME_MS)
+
+    result = measure(game.update, iterations, setup=advance)
+    dispose(game)
+    return {"update": result}
+
+
+def bench_save(iterations: int) -> Dict[str, Dict[str, float]]:
+    state = GameState(level=7, xp=42, hunger=61, happiness=80, love=55, energy=33, saved_at=time.time())
+    results = {"robust_save": measure(lambda: main.robust_save(state), iterations)}
+    results["load_state"] = measure(main.load_state, iterations)
+    return results
+
+
+def bench_sprites(iterations: int, cache_dir: Path) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for phase in PHASES:
+        for label, disk_cache in (("cold", None), ("disk_cache", main.SpriteDiskCache(cache_dir))):
+            manager = main.SpriteManager(disk_cache, atlas=main.SPRITE_ATLAS)
+            results[f"load_phase:{phase}:{label}"] = measure(
+                lambda: manager.load_phase(phase), iterations, setup=manager.cache.clear
+            )
+            manager.close()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Namen + Beschreibung aller Messungen, deren p50 gegenüber der Baseline zu langsam ist."""
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = max(base["p50_us"] * (1 + tolerance), base["p50_us"] + MIN_REGRESSION_US)
+        if current["p50_us"] > limit:
+            regressions.append(
+                f"{name}: p50 {current['p50_us']}us vs baseline {base['p50_us']}us (limit {limit:.1f}us)"
+            )
+    return regressions
+
+
+def main_cli(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless Tamagotchi benchmarks")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--only", default="", help="comma-separated groups: draw,update,save,load_phase")
+    parser.add_argument("--out", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against this JSON and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    # sprites/ liegt relativ zum Projektordner
+    os.chdir(Path(__file__).resolve().parent)
+    tmp = Path(tempfile.mkdtemp(prefix="tamago-bench-"))
+    main.SAVE_PATH = tmp / "save.json"
+    main.logger.setLevel("WARNING")
+    main.init_pygame()
+    pygame.display.set_mode((main.WIDTH, main.HEIGHT))
+
+    iterations = max(1, args.iterations)
+    sprite_iterations = max(1, iterations // 10)
+    groups = [
+        ("draw", lambda: bench_draw(iterations)),
+        ("update", lambda: bench_update(iterations * 10)),
+        ("save", lambda: bench_save(iterations)),
+        ("load_phase", lambda: bench_sprites(sprite_iterations, tmp / "sprite_cache")),
+    ]
+    only = {group for group in args.only.split(",") if group}
+    results: Dict[str, Dict[str, float]] = {}
+    for group, run in groups:
+        if not only or group in only:
+            results.update(run())
+
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}}  {'p50':>9} {'p95':>9} {'p99':>9}  {'alloc':>8} {'blocks':>7}")
+    for name, r in results.items():
+        print(
+            f"{name:<{width}}  {r['p50_us']:>7.1f}us {r['p95_us']:>7.1f}us {r['p99_us']:>7.1f}us"
+            f"  {r['alloc_peak_bytes']:>7}B {r['net_blocks']:>7}"
+        )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main_cli())
+    finally:
+        pygame.quit()
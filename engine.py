@@ -0,0 +1,628 @@
+"""
+Spielregeln ohne pygame: Zustand, Aktionen, Decay, Energy-Regen, Leveling, Death-Rule
+und Animations-Timing. Zeit kommt aus einer injizierbaren Uhr (ms), Zufall aus einem
+eigenen RNG, damit dieselben Regeln im Spiel, headless und schneller als Echtzeit laufen.
+"""
+
+import functools
+import itertools
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, ClassVar, List, Optional, Tuple
+
+# Animation langsamer
+IDLE_FRAME_MS = 2400
+ACTION_FRAME_MS = (1800, 2600)
+
+# Stat-Decay
+DECAY_MS = 10_000
+DECAY_HUNGER = -1
+DECAY_HAPPINESS = -1
+DECAY_LOVE = -1
+
+# Farbschwellen der Balken (bar_color); bestimmen auch Regen-Rate und Death-Rule
+GREEN_MIN = 70
+ORANGE_MIN = 35
+
+# Textbox länger
+DEFAULT_DIALOG_MS = 4200
+
+PHASES = {
+    "baby": range(1, 5),
+    "kid": range(5, 10),
+    "teen": range(10, 15),  # Level 10-14
+    "adult": range(15, 21),
+}
+
+# Kosten + Effekte
+ACTION_RULES = {
+    "FEED": {"cost": 2, "hunger": +22, "happiness": 0, "love": 0, "xp": 10, "anim": "feed"},
+    "PLAY": {"cost": 10, "hunger": -2, "happiness": +22, "love": +4, "xp": 14, "anim": "play"},
+    "CUDDLE": {"cost": 10, "hunger": -2, "happiness": +5, "love": +22, "xp": 14, "anim": "cuddle"},
+}
+
+# Ereignisse, die der Simulation-Owner z.B. persistiert (Werte = Journal-Record-Kinds)
+EVENT_ACTION = 1
+EVENT_DECAY = 2
+EVENT_LEVEL_UP = 3
+EVENT_DEATH = 4
+EVENT_RESET = 5
+EVENT_ACTIONS = {"FEED": 1, "PLAY": 2, "CUDDLE": 3}
+
+# "keine Deadline" für next_deadline_ms(rules_only=True), z.B. bei totem Haustier
+NEVER_MS = 2**62
+
+DIALOG = {
+    "baby": {
+        "FEED": ["Nom nom... 🍼", "ssschhlupp", "nyomnyomnyom"],
+        "PLAY": ["brbrrbrr", "brabrabra", "gugu gaga rassel lustig"],
+        "CUDDLE": ["geil", "so waaarm :D", "I like this..."],
+        "NO_ENERGY": ["wuaaah wuaah", "*baby kaputt warum tust du ihm das an", "wuaaaa"],
+        "HUNGRY": ["Gugu gaga ich bin ein baby gib mir essen", "Feed me..", "Mein Bauch..."],
+        "DEAD_LOVE": ["...  du liebst mich nicht."],
+        "DEAD_PLAY": ["...  du spielst nicht mit mir."],
+        "RESET": ["Du hast ein Baby Deno aufm Gewissen"],
+    },
+    "kid": {
+        "FEED": ["Lecker lecker", "ich satt :D", "Danki"],
+        "PLAY": ["Minecraft so cool yeah", "NOCHMAL!!", "SPIEL MIT MIR!!!"],
+        "CUDDLE": ["Ich liebe dich", "Schatzi :3", "Mein Schatziii"],
+        "NO_ENERGY": ["Keine Energie!", "Später...", "Ich kann nichtmal mehr zocken.. ;("],
+        "HUNGRY": ["Ich bin hungrig... 😣", "Feed me...", "I'm starving..."],
+        "DEAD_LOVE": ["... du liebst mich nicht."],
+        "DEAD_PLAY": ["... du spielst nicht mit mir."],
+        "RESET": ["Kind Deno tot weil du nicht auf ihn achten kannst"],
+    },
+    "teen": {
+        "FEED": ["Jetzt ein Babak", "ein dicker Jibb zum chillen", "Noch ein boun!!!"],
+        "PLAY": ["zweites zuhause :=)", "Ich muss die Pflanzen gießen :D", "Arbeiten.."],
+        "CUDDLE": ["JOANA <3 <3 <3 ", "Mein engelchen :3", "ily"],
+        "NO_ENERGY": ["nicht jetzt man", "subtile Hinweise dass ich kein bock hab", "pustekuchen vergiss es"],
+        "HUNGRY": ["Ich bin hungrig... 😣", "Fütter mich..", "Warum kein Essen ich Hunger"],
+        "DEAD_LOVE": ["...  du liebst mich nicht."],
+        "DEAD_PLAY": ["...  du spielst nicht mit mir."],
+        "RESET": ["Verkack es nicht nochmal!!!"],
+    },
+    "adult": {
+        "FEED": ["Fleisch!", "Ich stopf soviel in den Mund wie es nur geht", "*Zu voller Mund zum reden*"],
+        "PLAY": ["Jetz- MEIN AUTOOOO", "Ist das ein...", "BOOOMBOCLAT"],
+        "CUDDLE": ["MEIN SCHATZI", "DU ENGEL", "Ich brauche dich für immer"],
+        "NO_ENERGY": ["Digga bin tot", "nein vergiss es", "Später vll"],
+        "HUNGRY": ["Du nixgönner", "Ich würde selber kochen gerade wenn ich kein Tamagotchi wäre", "HUnger du idiot"],
+        "DEAD_LOVE": ["...  du liebst mich nicht."],
+        "DEAD_PLAY": ["...  du spielst nicht mit mir."],
+        "RESET": ["Hier kannst du unendlich resetten aber im echten leben gibt es mich nur einmal.."],
+    },
+}
+
+logger = logging.getLogger("tamagotchi")
+
+
+def clamp(value: float, lo: int = 0, hi: int = 100) -> int:
+    return max(lo, min(hi, int(value)))
+
+
+def xp_needed(level: int) -> int:
+    return 100 + (level - 1) * 25
+
+
+def apply_leveling(state: "GameState") -> None:
+    while state.level < 20 and state.xp >= xp_needed(state.level):
+        state.xp -= xp_needed(state.level)
+        state.level += 1
+        logger.info("Level up! New level: %s", state.level)
+
+
+def phase_for_level(level: int) -> str:
+    for phase, levels in PHASES.items():
+        if level in levels:
+            return phase
+    return "adult"
+
+
+def bar_color(value: int) -> str:
+    if value >= GREEN_MIN:
+        return "green"
+    if value >= ORANGE_MIN:
+        return "orange"
+    return "red"
+
+
+def color_bucket(hunger: int, happiness: int, love: int) -> Tuple[bool, str, str, str]:
+    """Alles, wovon die Regen-Rate abhängt: Hunger leer + die drei Balkenfarben."""
+    return (hunger <= 0, bar_color(hunger), bar_color(happiness), bar_color(love))
+
+
+@functools.lru_cache(maxsize=None)
+def fill_minutes_for_bucket(bucket: Tuple[bool, str, str, str]) -> float:
+    starving, *colors = bucket
+    if starving:
+        return 60.0
+    if colors[0] == "red":
+        return 20.0
+
+    orange_count = sum(1 for c in colors if c == "orange")
+
+    if all(c == "green" for c in colors):
+        return 7.5
+    if orange_count == 1:
+        return 10.0
+    if orange_count >= 2:
+        return 12.5
+
+    # fallback (z.B. love/happy rot, hunger aber nicht rot)
+    return 12.5
+
+
+def energy_fill_minutes(hunger: int, happiness: int, love: int) -> float:
+    """0 -> 100 in X Minuten abhängig von Farben (Hunger/Happiness/Love)."""
+    return fill_minutes_for_bucket(color_bucket(hunger, happiness, love))
+
+
+def regen_energy(energy: float, rate_per_ms: float, dt_ms: int) -> float:
+    """
+    Energy nach dt_ms Regen. Rundungsfehler vieler kleiner Schritte werden auf den ganzen
+    Wert gezogen, damit update() alle 33 ms und ein Sprung (run_until) gleich enden.
+    """
+    energy = min(100.0, energy + rate_per_ms * dt_ms)
+    nearest = round(energy)
+    return float(nearest) if abs(energy - nearest) < 1e-9 else energy
+
+
+def death_reason(hunger: int, happiness: int, love: int) -> Optional[str]:
+    """Death rule: hunger == 0 AND (love red OR happiness red); Dialog-Key oder None."""
+    if hunger > 0:
+        return None
+    if love < ORANGE_MIN:
+        return "DEAD_LOVE"
+    if happiness < ORANGE_MIN:
+        return "DEAD_PLAY"
+    return None
+
+
+def _threshold_ticks(value: int, delta: int, thresholds: Tuple[int, ...]) -> List[int]:
+    """Decay-Ticks k >= 1, bei denen clamp(value + k * delta) eine der Schwellen kreuzt."""
+    ticks = []
+    for threshold in thresholds:
+        if delta < 0 and value >= threshold:
+            ticks.append((value - threshold) // -delta + 1)
+        elif delta > 0 and value < threshold:
+            ticks.append(-(-(threshold - value) // delta))
+    return ticks
+
+
+@dataclass
+class CatchUpResult:
+    ticks: int
+    energy: float
+    died: Optional[str] = None
+
+
+def catch_up(state: "GameState", energy: float, elapsed_ms: int) -> CatchUpResult:
+    """
+    Wendet Decay, Energy-Regen und Death-Rule für elapsed_ms Offline-Zeit an (state wird
+    verändert). Zwischen zwei Schwellen-Übergängen ist die Regen-Rate konstant, daher
+    wird nur von Übergang zu Übergang gesprungen statt jeden Tick zu simulieren.
+    """
+    if state.dead or elapsed_ms <= 0:
+        return CatchUpResult(0, energy)
+
+    total_ticks = elapsed_ms // DECAY_MS
+    start = (state.hunger, state.happiness, state.love)
+    deltas = (DECAY_HUNGER, DECAY_HAPPINESS, DECAY_LOVE)
+
+    def stats_after(ticks: int) -> Tuple[int, int, int]:
+        return tuple(clamp(value + delta * ticks) for value, delta in zip(start, deltas))  # type: ignore[return-value]
+
+    # Nur an diesen Ticks kann sich die Rate oder die Death-Rule ändern (hunger <= 0 == hunger < 1)
+    changes = set(_threshold_ticks(start[0], deltas[0], (GREEN_MIN, ORANGE_MIN, 1)))
+    changes.update(_threshold_ticks(start[1], deltas[1], (GREEN_MIN, ORANGE_MIN)))
+    changes.update(_threshold_ticks(start[2], deltas[2], (GREEN_MIN, ORANGE_MIN)))
+    points = [0] + sorted(k for k in changes if 0 < k <= total_ticks)
+
+    for i, tick in enumerate(points):
+        hunger, happiness, love = stats_after(tick)
+        reason = death_reason(hunger, happiness, love)
+        if reason is not None:
+            state.hunger, state.happiness, state.love = hunger, happiness, love
+            state.dead = True
+            energy = regen_energy(energy, 0.0, 0)
+            state.energy = clamp(energy)
+            return CatchUpResult(tick, energy, reason)
+
+        segment_end = points[i + 1] * DECAY_MS if i + 1 < len(points) else elapsed_ms
+        if energy < 100:
+            rate_per_ms = 100.0 / (energy_fill_minutes(hunger, happiness, love) * 60_000.0)
+            # wie update_energy(), damit clamp() gleich rundet
+            energy = regen_energy(energy, rate_per_ms, segment_end - tick * DECAY_MS)
+
+    state.hunger, state.happiness, state.love = stats_after(total_ticks)
+    state.energy = clamp(energy)
+    return CatchUpResult(total_ticks, energy)
+
+
+@dataclass
+class GameState:
+    level: int = 1
+    xp: int = 0
+    hunger: int = 50
+    happiness: int = 50
+    love: int = 50
+    energy: int = 50
+    age_days: int = 0
+    dead: bool = False
+    saved_at: float = 0.0  # Wall-Clock (time.time()) des Saves, für die Offline-Nachberechnung
+
+    _versions: ClassVar["itertools.count[int]"] = itertools.count(1)
+
+    def __post_init__(self) -> None:
+        # version: prozessweit eindeutig, springt bei jeder echten Feldänderung. Bewusst kein
+        # Dataclass-Feld, damit asdict() (Save, Journal) es nicht mitschreibt.
+        self.version: int
+        object.__setattr__(self, "version", next(GameState._versions))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, name, None) != value:
+            object.__setattr__(self, "version", next(GameState._versions))
+        object.__setattr__(self, name, value)
+
+    @property
+    def current_phase(self) -> str:
+        return phase_for_level(self.level)
+
+
+class VirtualClock:
+    """Von Hand gestellte Uhr (ms) für Headless-Läufe; ersetzt pygame.time.get_ticks."""
+
+    def __init__(self, start_ms: int = 0) -> None:
+        self.now_ms = start_ms
+
+    def __call__(self) -> int:
+        return self.now_ms
+
+    def set(self, ms: int) -> None:
+        self.now_ms = ms
+
+    def advance(self, ms: int) -> None:
+        self.now_ms += ms
+
+
+class Simulation:
+    """
+    Alle Spielregeln eines Haustiers. Game ist nur noch die Ansicht darüber;
+    headless reicht Simulation(clock=VirtualClock()) + handle_action()/run_until().
+    """
+
+    def __init__(
+        self,
+        state: Optional[GameState] = None,
+        clock: Optional[Callable[[], int]] = None,
+        rng: Optional[random.Random] = None,
+        wall_clock: Callable[[], float] = time.time,
+        on_event: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        self.state = state if state is not None else GameState()
+        self.clock = clock if clock is not None else VirtualClock()
+        self.rng = rng if rng is not None else random.Random()
+        self.wall_clock = wall_clock
+        # (kind, arg) bei Aktion, Decay, Level-Up, Tod, Reset
+        self.on_event = on_event
+
+        now = self.clock()
+        self.current_action = "idle"
+        self.frame_index = 0
+        # Takt der Idle-Animation; Game verlangsamt bzw. stoppt ihn im Stromsparmodus
+        self.idle_frame_ms = IDLE_FRAME_MS
+        self.next_frame_change_ms = now + self.idle_frame_ms
+        self.locked = False
+
+        self.last_decay_ms = now
+
+        # Energy float for accurate regen timings
+        self.energy_float = float(self.state.energy)
+        self.last_energy_update_ms = now
+
+        # Regen-Rate, neu bestimmt nur wenn sich hunger/happiness/love ändern (regen_rate_per_ms)
+        self._regen_stats: Optional[Tuple[int, int, int]] = None
+        self._regen_bucket: Optional[Tuple[bool, str, str, str]] = None
+        self._regen_rate_per_ms = 0.0
+
+        self.hunger_warning_shown = False
+
+        self.status_message = ""
+        self.status_message_until_ms = 0
+
+    def emit(self, kind: int, arg: int = 0) -> None:
+        if self.on_event is not None:
+            self.on_event(kind, arg)
+
+    def catch_up_offline(self) -> Optional[CatchUpResult]:
+        """Decay/Regen/Death für die Zeit seit dem letzten Save nachholen."""
+        if not self.state.saved_at:
+            return None
+        elapsed_ms = int((self.wall_clock() - self.state.saved_at) * 1000)
+        if elapsed_ms <= 0:
+            return None
+        result = catch_up(self.state, self.energy_float, elapsed_ms)
+
+        # auch ohne vollen Tick: Regen ist schon in state.energy, das Decay-Intervall läuft weiter
+        self.energy_float = result.energy
+        self.last_decay_ms = self.clock() - elapsed_ms % DECAY_MS
+        if result.ticks:
+            logger.info("Offline for %ss: applied %s decay ticks", elapsed_ms // 1000, result.ticks)
+        if result.died is not None:
+            self.say(result.died, 7000)
+            self.emit(EVENT_DEATH)
+        return result
+
+    def set_status(self, msg: str, ms: int = DEFAULT_DIALOG_MS) -> None:
+        self.status_message = msg
+        self.status_message_until_ms = self.clock() + ms
+
+    def say(self, key: str, ms: int = DEFAULT_DIALOG_MS) -> None:
+        phase = self.state.current_phase
+        options = DIALOG.get(phase, {}).get(key, [])
+        if not options:
+            self.set_status(key, ms)
+            return
+        self.set_status(self.rng.choice(options), ms)
+
+    def reset(self) -> None:
+        now = self.clock()
+        self.state = GameState()
+        self.energy_float = float(self.state.energy)
+        self.last_energy_update_ms = now
+
+        self.current_action = "idle"
+        self.locked = False
+        self.frame_index = 0
+        self.next_frame_change_ms = now + self.idle_frame_ms
+
+        self.hunger_warning_shown = False
+
+        self.emit(EVENT_RESET)
+        self.say("RESET", 3000)
+
+    def regen_rate_per_ms(self) -> float:
+        """Energy pro ms; die Farben werden nur bei geänderten Stats neu bestimmt, die Rate nur bei neuem Bucket."""
+        stats = (self.state.hunger, self.state.happiness, self.state.love)
+        if stats != self._regen_stats:
+            self._regen_stats = stats
+            bucket = color_bucket(*stats)
+            if bucket != self._regen_bucket:
+                self._regen_bucket = bucket
+                self._regen_rate_per_ms = 100.0 / (fill_minutes_for_bucket(bucket) * 60_000.0)
+        return self._regen_rate_per_ms
+
+    def update_energy(self) -> None:
+        """Kontinuierliche Energy-Regeneration, nur idle + nicht locked + nicht dead."""
+        now = self.clock()
+        dt_ms = now - self.last_energy_update_ms
+        self.last_energy_update_ms = now
+
+        if self.state.dead:
+            return
+        if self.current_action != "idle" or self.locked:
+            return
+        if self.state.energy >= 100:
+            self.energy_float = 100.0
+            return
+
+        self.energy_float = regen_energy(self.energy_float, self.regen_rate_per_ms(), dt_ms)
+        new_energy = clamp(self.energy_float)
+        if new_energy != self.state.energy:
+            self.state.energy = new_energy
+
+    def energy_eta_ms(self) -> Optional[int]:
+        """
+        ms ab last_energy_update_ms, nach denen update_energy() den nächsten ganzen Wert
+        erreicht; None wenn gerade keine Regen läuft. Exakt: gleiche Rechnung wie dort, daher
+        wacht die Loop weder zu früh (ohne Änderung) noch zu spät auf.
+        """
+        if self.state.dead or self.current_action != "idle" or self.locked:
+            return None
+        if self.state.energy >= 100:
+            return None
+
+        rate_per_ms = self.regen_rate_per_ms()
+        target = self.state.energy + 1
+        eta = max(1, math.ceil((target - self.energy_float) / rate_per_ms))
+        # Division und Multiplikation runden unterschiedlich; auf den ersten passenden ms korrigieren
+        while regen_energy(self.energy_float, rate_per_ms, eta) < target:
+            eta += 1
+        while eta > 1 and regen_energy(self.energy_float, rate_per_ms, eta - 1) >= target:
+            eta -= 1
+        return eta
+
+    def next_deadline_ms(self, rules_only: bool = False) -> int:
+        """
+        Frühester Zeitpunkt, an dem update() etwas ändert. rules_only lässt rein sichtbare
+        Änderungen weg (Idle-Frames, ganzzahlige Energy-Schritte, Dialog-Ende).
+        """
+        deadlines = []
+        if not rules_only or self.current_action != "idle":
+            deadlines.append(self.next_frame_change_ms)
+        if not self.state.dead:
+            deadlines.append(self.last_decay_ms + DECAY_MS)
+        if not rules_only:
+            energy_eta = self.energy_eta_ms()
+            if energy_eta is not None:
+                deadlines.append(self.last_energy_update_ms + energy_eta)
+            if self.status_message:
+                deadlines.append(self.status_message_until_ms)
+        return min(deadlines) if deadlines else NEVER_MS
+
+    def handle_action(self, action: str) -> None:
+        # Eingaben während einer Aktions-Animation zählen nicht
+        if self.locked:
+            return
+
+        if self.state.dead:
+            if action == "RESET":
+                self.reset()
+            return
+
+        if action == "RESET":
+            return
+
+        rule = ACTION_RULES.get(action)
+        if not rule:
+            return
+
+        cost = int(rule.get("cost", 0))
+        if self.state.energy < cost:
+            self.say("NO_ENERGY", 2600)
+            return
+
+        # Pay cost
+        self.energy_float = float(self.state.energy)
+        self.state.energy = clamp(self.state.energy - cost)
+        self.energy_float = float(self.state.energy)
+
+        # Apply effects
+        self.state.hunger = clamp(self.state.hunger + int(rule.get("hunger", 0)))
+        self.state.happiness = clamp(self.state.happiness + int(rule.get("happiness", 0)))
+        self.state.love = clamp(self.state.love + int(rule.get("love", 0)))
+        self.state.xp += int(rule.get("xp", 0))
+
+        self.start_animation(str(rule.get("anim", "idle")))
+        self.say(action, DEFAULT_DIALOG_MS)
+
+        level_before = self.state.level
+        apply_leveling(self.state)
+        self.emit(EVENT_ACTION, EVENT_ACTIONS.get(action, 0))
+        if self.state.level != level_before:
+            self.emit(EVENT_LEVEL_UP, self.state.level)
+
+    def set_idle_frame_ms(self, ms: int) -> None:
+        """Neuer Takt der Idle-Animation ab jetzt (NEVER_MS = eingefroren); Aktions-Animationen bleiben."""
+        self.idle_frame_ms = ms
+        if self.current_action == "idle":
+            self.next_frame_change_ms = self.clock() + ms
+
+    def start_animation(self, action: str) -> None:
+        self.locked = True
+        self.current_action = action
+        self.frame_index = 0
+        self.next_frame_change_ms = self.clock() + self.rng.randint(*ACTION_FRAME_MS)
+
+    def update(self) -> None:
+        now = self.clock()
+
+        # Energy regen (dynamisch) zuerst: die Zeit seit dem letzten update() zählt mit der
+        # Rate und dem Lock-Zustand, die in ihr galten, nicht mit denen nach Decay bzw.
+        # Animationsende. Sonst hinge das Ergebnis davon ab, wie oft update() läuft (run_until).
+        self.update_energy()
+
+        # Animation frame switching
+        if self.current_action == "idle":
+            if now >= self.next_frame_change_ms:
+                self.frame_index = 1 - self.frame_index
+                self.next_frame_change_ms = now + self.idle_frame_ms
+        elif now >= self.next_frame_change_ms:
+            # ab dem geplanten Frame-Ende rechnen, nicht ab dem Frame, in dem update() es merkt
+            frame_end_ms = self.next_frame_change_ms
+            if self.frame_index == 0:
+                self.frame_index = 1
+                self.next_frame_change_ms = frame_end_ms + self.rng.randint(*ACTION_FRAME_MS)
+            else:
+                self.current_action = "idle"
+                self.frame_index = 0
+                self.next_frame_change_ms = now + self.idle_frame_ms
+                self.locked = False
+                # gesperrte Zeit bringt kein Regen, erst die seit dem Animationsende
+                self.last_energy_update_ms = frame_end_ms
+                self.update_energy()
+
+        # Stat decay
+        if not self.state.dead and now - self.last_decay_ms >= DECAY_MS:
+            self.state.hunger = clamp(self.state.hunger + DECAY_HUNGER)
+            self.state.happiness = clamp(self.state.happiness + DECAY_HAPPINESS)
+            self.state.love = clamp(self.state.love + DECAY_LOVE)
+            # im festen Raster bleiben, sonst verschiebt jeder Frame-Takt den nächsten Tick;
+            # nach langem Stillstand (z.B. tot, Reset) neu ab jetzt
+            behind = now - self.last_decay_ms >= 2 * DECAY_MS
+            self.last_decay_ms = now if behind else self.last_decay_ms + DECAY_MS
+            self.emit(EVENT_DECAY)
+
+        # Hunger=0 warning (einmal)
+        if not self.state.dead and self.state.hunger <= 0 and not self.hunger_warning_shown:
+            self.say("HUNGRY", 5200)
+            self.hunger_warning_shown = True
+        if not self.state.dead and self.state.hunger > 0:
+            self.hunger_warning_shown = False
+
+        # Death rule: hunger == 0 AND (love red OR happiness red)
+        reason = None if self.state.dead else death_reason(self.state.hunger, self.state.happiness, self.state.love)
+        if reason is not None:
+            self.state.dead = True
+            self.current_action = "idle"
+            self.locked = False
+            self.frame_index = 0
+            self.next_frame_change_ms = now + self.idle_frame_ms
+
+            self.say(reason, 7000)
+            self.emit(EVENT_DEATH)
+
+        # Status timeout
+        if now >= self.status_message_until_ms:
+            self.status_message = ""
+
+    def run_until(self, until_ms: int) -> None:
+        """
+        Fast-forward bis until_ms (nur mit VirtualClock): update() läuft ausschließlich an
+        regelrelevanten Deadlines, dazwischen ändert sich nichts, was die Regeln sehen.
+        """
+        clock = self.clock
+        assert isinstance(clock, VirtualClock), "run_until needs a VirtualClock"
+        while True:
+            deadline = self.next_deadline_ms(rules_only=True)
+            if deadline > until_ms:
+                break
+            clock.set(max(deadline, clock()))
+            self.update()
+        if clock() < until_ms:
+            clock.set(until_ms)
+            self.update()
+
+
+def check_fast_forward(minutes: int = 60, action_every_ms: int = 15_000, step_ms: int = 33, seed: int = 1) -> bool:
+    """
+    Vergleicht run_until mit dem Takt der echten Schleife (update() alle step_ms) bei
+    regelmäßigen Aktionen; beide müssen im selben Zustand enden.
+    """
+    actions = ("FEED", "PLAY", "CUDDLE")
+    end_ms = minutes * 60_000
+    results = []
+    for fast_forward in (False, True):
+        clock = VirtualClock()
+        sim = Simulation(clock=clock, rng=random.Random(seed), wall_clock=lambda: 0.0)
+        trace = []
+        for i, at_ms in enumerate(range(action_every_ms, end_ms + 1, action_every_ms)):
+            if fast_forward:
+                sim.run_until(at_ms)
+            else:
+                while clock() + step_ms < at_ms:
+                    clock.advance(step_ms)
+                    sim.update()
+                clock.set(at_ms)
+                sim.update()
+            sim.handle_action(actions[i % len(actions)])
+            trace.append(sim.state.energy)
+        results.append((replace(sim.state), sim.current_action, trace))
+
+    (stepped, stepped_action, stepped_trace), (forwarded, forwarded_action, forwarded_trace) = results
+    if stepped_trace != forwarded_trace:
+        first = next(i for i, (a, b) in enumerate(zip(stepped_trace, forwarded_trace)) if a != b)
+        logger.error("Energy differs from action %s on: stepped %s, run_until %s",
+                     first + 1, stepped_trace[first:first + 5], forwarded_trace[first:first + 5])
+    logger.info("stepped %s %s / run_until %s %s", stepped, stepped_action, forwarded, forwarded_action)
+    return stepped_trace == forwarded_trace and stepped == forwarded and stepped_action == forwarded_action
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    raise SystemExit(0 if check_fast_forward() else 1)
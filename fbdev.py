@@ -0,0 +1,129 @@
+"""
+Optionale Ausgabe direkt in einen Linux-Framebuffer (TAMAGO_FBDEV=/dev/fb1), z.B. für
+SPI-Displays, bei denen SDL nur einen langsamen Pfad findet. Game zeichnet dann in eine
+Offscreen-Surface (XRGB8888); update() wandelt nur die Zeilen der Dirty-Rects mit NumPy
+nach RGB565 um und schreibt sie ins gemappte Gerät. Eine normale Datei funktioniert
+genauso (Größe = Breite x Höhe x 2), damit lässt sich die Ausgabe ohne Display prüfen:
+
+    touch /tmp/fb.raw && TAMAGO_FBDEV=/tmp/fb.raw python3 main.py
+    python3 fbdev.py /tmp/fb.raw fb.png
+"""
+
+import mmap
+import os
+import stat
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pygame
+
+# Standard-Masken einer 32-Bit-Surface ohne Alpha
+XRGB8888_MASKS = (0xFF0000, 0x00FF00, 0x0000FF, 0)
+
+
+def framebuffer_geometry(path: Path, size: Tuple[int, int]) -> Tuple[int, int, int]:
+    """(Breite, Höhe, Bytes pro Zeile); für Geräte aus sysfs, für Dateien aus size."""
+    if not stat.S_ISCHR(os.stat(path).st_mode):
+        return size[0], size[1], size[0] * 2
+
+    sysfs = Path("/sys/class/graphics") / path.name
+    bits = int((sysfs / "bits_per_pixel").read_text().strip())
+    if bits != 16:
+        raise ValueError(f"{path} uses {bits} bits per pixel; only RGB565 is supported")
+    width, height = (int(v) for v in (sysfs / "virtual_size").read_text().strip().split(","))
+    stride = int((sysfs / "stride").read_text().strip())
+    return width, height, stride
+
+
+def row_spans(rects: Sequence[pygame.Rect], height: int) -> List[Tuple[int, int]]:
+    """Zeilenbereiche [top, bottom) aller Rects, sortiert und zusammengelegt."""
+    spans: List[Tuple[int, int]] = []
+    for top, bottom in sorted((max(0, r.top), min(height, r.bottom)) for r in rects):
+        if top >= bottom:
+            continue
+        if spans and top <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], bottom))
+        else:
+            spans.append((top, bottom))
+    return spans
+
+
+def to_rgb565(pixels: np.ndarray) -> np.ndarray:
+    """XRGB8888-Werte (uint32) -> RGB565 (uint16), oberste Bits je Kanal."""
+    return (((pixels >> 8) & 0xF800) | ((pixels >> 5) & 0x07E0) | ((pixels >> 3) & 0x001F)).astype(np.uint16)
+
+
+class FramebufferOutput:
+    """Offscreen-Surface + mmap des Framebuffers; gleiche Schnittstelle wie DisplayOutput in main.py."""
+
+    def __init__(self, path: str, size: Tuple[int, int]) -> None:
+        self.path = Path(path)
+        fb_width, fb_height, stride = framebuffer_geometry(self.path, size)
+        if (fb_width, fb_height) != size:
+            raise ValueError(f"{path} is {fb_width}x{fb_height}, the game renders {size[0]}x{size[1]}")
+
+        self.fh = self.path.open("r+b")
+        try:
+            length = stride * fb_height
+            st = os.fstat(self.fh.fileno())
+            # Datei als Framebuffer-Ersatz auf volle Größe bringen
+            if not stat.S_ISCHR(st.st_mode) and st.st_size < length:
+                self.fh.truncate(length)
+            self.mm = mmap.mmap(self.fh.fileno(), length)
+        except Exception:
+            self.fh.close()
+            raise
+        # Zeilen mit Stride, rechts evtl. Padding
+        self.fb = np.ndarray((fb_height, stride // 2), dtype="<u2", buffer=self.mm)[:, :fb_width]
+        self.surface = pygame.Surface(size, 0, 32, XRGB8888_MASKS)
+
+    def update(self, rects: Sequence[pygame.Rect]) -> None:
+        spans = row_spans(rects, self.surface.get_height())
+        if not spans:
+            return
+        # Referenz auf die Pixel sperrt die Surface; vor dem nächsten Blit wieder freigeben
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        try:
+            for top, bottom in spans:
+                self.fb[top:bottom] = to_rgb565(pixels[:, top:bottom].T)
+        finally:
+            del pixels
+
+    def flip(self) -> None:
+        self.update([self.surface.get_rect()])
+
+    def close(self) -> None:
+        del self.fb
+        self.mm.close()
+        self.fh.close()
+
+
+def read_rgb565(path: Path, size: Tuple[int, int], stride: Optional[int] = None) -> pygame.Surface:
+    """Inhalt eines (Datei-)Framebuffers als Surface, zum Anschauen bzw. Vergleichen."""
+    width, height = size
+    stride = stride or width * 2
+    raw = np.fromfile(path, dtype="<u2", count=stride // 2 * height).reshape(height, stride // 2)[:, :width]
+    raw = raw.astype(np.uint32)
+    rgb = np.empty((width, height, 3), dtype=np.uint8)
+    # 5/6 Bit wieder auf 0..255 skaliert
+    rgb[..., 0] = (((raw >> 11) & 0x1F) * 255 // 31).T
+    rgb[..., 1] = (((raw >> 5) & 0x3F) * 255 // 63).T
+    rgb[..., 2] = ((raw & 0x1F) * 255 // 31).T
+    return pygame.surfarray.make_surface(rgb)
+
+
+def main(argv: Optional[list] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("usage: fbdev.py <framebuffer file> <out.png>", file=sys.stderr)
+        return 2
+    from main import HEIGHT, WIDTH
+
+    pygame.image.save(read_rgb565(Path(argv[0]), (WIDTH, HEIGHT)), argv[1])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,45 @@
+import hashlib
 import json
 import logging
+import mmap
 import os
 import random
-import signal
-import subprocess
-from dataclasses import asdict, dataclass
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
-import pygame
+# Startzeit-Aufschlüsselung: "import" = pygame + engine
+_IMPORT_STARTED = time.perf_counter()
+
+import pygame  # noqa: E402
+
+from engine import (  # noqa: E402
+    ACTION_RULES,
+    DEFAULT_DIALOG_MS,
+    EVENT_DECAY,
+    GREEN_MIN,
+    IDLE_FRAME_MS,
+    NEVER_MS,
+    ORANGE_MIN,
+    GameState,
+    Simulation,
+    VirtualClock,
+    phase_for_level,
+    xp_needed,
+)
+
+IMPORT_S = time.perf_counter() - _IMPORT_STARTED
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from fbdev import FramebufferOutput
 
 WIDTH, HEIGHT = 320, 480
 SPRITE_SIZE = 128
@@ -16,132 +47,226 @@ SPRITE_X = 96
 SPRITE_Y = 70
 FPS = 30
 
+# Hauptschleife: "event" schläft bis zur nächsten Deadline, "fixed" pollt mit FPS
+LOOP_MODE = os.environ.get("TAMAGO_LOOP", "event")
+# Obergrenze fürs Schlafen, damit Signale zeitnah verarbeitet werden
+MAX_WAIT_MS = 1000
+
+# Stromsparmodus nach so vielen Minuten ohne Touch/Taste: Loop schläft bis zur nächsten
+# Stat-Änderung, Idle-Animation langsamer bzw. eingefroren, optional gedimmt; 0 = aus
+IDLE_MINUTES = float(os.environ.get("TAMAGO_IDLE_MINUTES", "5"))
+# Idle-Frame-Wechsel im Stromsparmodus alle N ms; 0 = eingefroren
+POWER_SAVE_FRAME_MS = int(os.environ.get("TAMAGO_IDLE_FRAME_MS", "0"))
+# sysfs-Backlight-Verzeichnis (brightness, max_brightness); leer = nicht dimmen
+BACKLIGHT_PATH = os.environ.get("TAMAGO_BACKLIGHT", "")
+# Helligkeit im Stromsparmodus in % von max_brightness
+IDLE_BRIGHTNESS = int(os.environ.get("TAMAGO_IDLE_BRIGHTNESS", "10"))
+
+BG_COLOR = (25, 25, 35)
+
+# "minimal": nur Display (inkl. Events) und Font; "full": pygame.init() mit Mixer, Joystick usw.
+PYGAME_INIT = os.environ.get("TAMAGO_PYGAME_INIT", "minimal")
+
+# Debug: jeden Frame komplett neu zeichnen statt Dirty-Rects
+FULL_REDRAW = os.environ.get("TAMAGO_FULL_REDRAW", "0") == "1"
+
+# Frame-Zeiten: Ringpuffer über die letzten N Frames je Loop-Phase
+FRAME_STATS_SIZE = 512
+FRAME_PHASES = ("events", "update", "draw", "flip", "sleep")
+# Zusammenfassung ins Log (selten, läuft auch ohne Overlay)
+FRAME_SUMMARY_MS = 10 * 60_000
+# Bucket-Grenzen (s) der kumulativen Histogramme für den Metrics-Endpoint
+FRAME_BUCKETS_S = (0.001, 0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 1.0)
+SAVE_BUCKETS_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Overlay: F3 oder Sprite so lange gedrückt halten
+LONG_PRESS_MS = 1500
+OVERLAY_REFRESH_MS = 500
+
+# Bildschirm-Regionen für den Dirty-Rect-Renderer
+SPRITE_RECT = pygame.Rect(SPRITE_X, SPRITE_Y, SPRITE_SIZE, SPRITE_SIZE)
+INFO_RECT = pygame.Rect(0, 18, 250, 22)
+BAR_TOPS = {"Hunger": 220, "Happiness": 252, "Love": 284, "Energy": 316}
+DIALOG_RECT = pygame.Rect(0, 350, WIDTH, 42)
+BUTTONS_RECT = pygame.Rect(0, 420, WIDTH, 45)
+OVERLAY_RECT = pygame.Rect(4, 44, 196, 92)
+
 SAVE_PATH = Path("/home/pi/tamagotchi/save.json")
 AUTOSAVE_MS = 60_000
 
+# Ausgabe direkt in einen Framebuffer (RGB565, z.B. /dev/fb1) statt über SDL; leer = aus
+FBDEV_PATH = os.environ.get("TAMAGO_FBDEV", "")
+
+# Prometheus-Textformat unter /metrics: "9100" bzw. "host:port" (HTTP) oder "unix:/pfad"; leer = aus
+METRICS_ADDRESS = os.environ.get("TAMAGO_METRICS", "")
+
+# "none": nur rename, "file": fsync der Temp-Datei, "dir": zusätzlich fsync des Verzeichnisses
+SAVE_DURABILITY = os.environ.get("TAMAGO_SAVE_DURABILITY", "dir")
+if SAVE_DURABILITY not in ("none", "file", "dir"):
+    SAVE_DURABILITY = "dir"
+
+# "json": Snapshot pro Save, "journal": Append-only-Journal + periodischer Snapshot
+SAVE_BACKEND = os.environ.get("TAMAGO_SAVE_BACKEND", "json")
+JOURNAL_COMPACT_RECORDS = 500
+JOURNAL_COMPACT_MS = 30 * 60_000
+# kind, arg, level, hunger, happiness, love, energy, dead, xp, age_days, Wall-Clock, crc32
+JOURNAL_RECORD = struct.Struct("<8BIH2xdI")
+# Record-Kinds: RECORD_SAVE oder eines der EVENT_* aus engine
+RECORD_SAVE = 0
+
+# Input-Log: TAMAGO_RECORD=<pfad> zeichnet auf, `main.py --replay <pfad>` spielt headless ab
+RECORD_PATH = os.environ.get("TAMAGO_RECORD", "")
+# Fester Seed für den Spiel-RNG (sonst zufällig; steht im Input-Log)
+SEED = os.environ.get("TAMAGO_SEED", "")
+INPUT_LOG_MAGIC = b"TIL1"
+# Magic, Seed, Wall-Clock beim Start, Ticks beim Start, Länge des Anfangszustands (JSON)
+INPUT_LOG_HEADER = struct.Struct("<4sQdIH")
+# Input-Kinds, jeweils gefolgt vom Zeitabstand zum vorigen Record (varint, ms)
+INPUT_TICK = 0  # ein update()
+INPUT_MOUSE = 1  # + Button, x, y
+INPUT_KEY = 2  # + Key (varint)
+INPUT_QUIT = 3
+INPUT_WAKE = 4  # Touch, der nur das gedimmte Display geweckt hat (kein Button)
+INPUT_END = 255  # + Länge + Endzustand (JSON) zum Vergleich beim Replay
+
 SPRITES_DIR = Path("sprites")
 
-# Animation langsamer
-IDLE_FRAME_MS = 2400
-ACTION_FRAME_MS = (1800, 2600)
+# Vorskalierte Sprites als Rohpixel unter <save dir>/sprite_cache
+SPRITE_CACHE = os.environ.get("TAMAGO_SPRITE_CACHE", "1") == "1"
+SPRITE_CACHE_MAGIC = b"TSC1"
+# Magic, Stamp (sha1 über Quellen + SPRITE_SIZE + Format), Breite, Höhe, Pixelformat
+SPRITE_CACHE_HEADER = struct.Struct("<4s20sHH8s")
 
-# Stat-Decay
-DECAY_MS = 10_000
-DECAY_HUNGER = -1
-DECAY_HAPPINESS = -1
-DECAY_LOVE = -1
+# Optional: alle Frames einer Phase in eine Atlas-Surface packen
+SPRITE_ATLAS = os.environ.get("TAMAGO_SPRITE_ATLAS", "0") == "1"
+ATLAS_COLUMNS = 4
 
-# Textbox länger
-DEFAULT_DIALOG_MS = 4200
+# Optional: TTF-Datei direkt laden (sonst pygame's mitgelieferter Default-Font, ohne fontconfig)
+FONT_FILE = os.environ.get("TAMAGO_FONT", "")
 
-PHASES = {
-    "baby": range(1, 5),
-    "kid": range(5, 10),
-    "teen": range(10, 15),  # Level 10-14
-    "adult": range(15, 21),
-}
+# Schlüsselfarbe für Surfaces mit 1-Bit-Alpha (Colorkey + RLE statt Alpha-Blending)
+COLORKEY = (255, 0, 255)
+
+# Max. gecachte Text-Surfaces (Labels, Buttons, Dialog)
+TEXT_CACHE_SIZE = 128
 
 # Sprite actions mit 2 Frames
 ACTIONS_2FR = ["idle", "feed", "play", "cuddle", "no_energy"]
 
-# Kosten + Effekte
-ACTION_RULES = {
-    "FEED": {"cost": 2, "hunger": +22, "happiness": 0, "love": 0, "xp": 10, "anim": "feed"},
-    "PLAY": {"cost": 10, "hunger": -2, "happiness": +22, "love": +4, "xp": 14, "anim": "play"},
-    "CUDDLE": {"cost": 10, "hunger": -2, "happiness": +5, "love": +22, "xp": 14, "anim": "cuddle"},
-}
-
-DIALOG = {
-    "baby": {
-        "FEED": ["Nom nom... 🍼", "ssschhlupp", "nyomnyomnyom"],
-        "PLAY": ["brbrrbrr", "brabrabra", "gugu gaga rassel lustig"],
-        "CUDDLE": ["geil", "so waaarm :D", "I like this..."],
-        "NO_ENERGY": ["wuaaah wuaah", "*baby kaputt warum tust du ihm das an", "wuaaaa"],
-        "HUNGRY": ["Gugu gaga ich bin ein baby gib mir essen", "Feed me..", "Mein Bauch..."],
-        "DEAD_LOVE": ["...  du liebst mich nicht."],
-        "DEAD_PLAY": ["...  du spielst nicht mit mir."],
-        "RESET": ["Du hast ein Baby Deno aufm Gewissen"],
-    },
-    "kid": {
-        "FEED": ["Lecker lecker", "ich satt :D", "Danki"],
-        "PLAY": ["Minecraft so cool yeah", "NOCHMAL!!", "SPIEL MIT MIR!!!"],
-        "CUDDLE": ["Ich liebe dich", "Schatzi :3", "Mein Schatziii"],
-        "NO_ENERGY": ["Keine Energie!", "Später...", "Ich kann nichtmal mehr zocken.. ;("],
-        "HUNGRY": ["Ich bin hungrig... 😣", "Feed me...", "I'm starving..."],
-        "DEAD_LOVE": ["... du liebst mich nicht."],
-        "DEAD_PLAY": ["... du spielst nicht mit mir."],
-        "RESET": ["Kind Deno tot weil du nicht auf ihn achten kannst"],
-    },
-    "teen": {
-        "FEED": ["Jetzt ein Babak", "ein dicker Jibb zum chillen", "Noch ein boun!!!"],
-        "PLAY": ["zweites zuhause :=)", "Ich muss die Pflanzen gießen :D", "Arbeiten.."],
-        "CUDDLE": ["JOANA <3 <3 <3 ", "Mein engelchen :3", "ily"],
-        "NO_ENERGY": ["nicht jetzt man", "subtile Hinweise dass ich kein bock hab", "pustekuchen vergiss es"],
-        "HUNGRY": ["Ich bin hungrig... 😣", "Fütter mich..", "Warum kein Essen ich Hunger"],
-        "DEAD_LOVE": ["...  du liebst mich nicht."],
-        "DEAD_PLAY": ["...  du spielst nicht mit mir."],
-        "RESET": ["Verkack es nicht nochmal!!!"],
-    },
-    "adult": {
-        "FEED": ["Fleisch!", "Ich stopf soviel in den Mund wie es nur geht", "*Zu voller Mund zum reden*"],
-        "PLAY": ["Jetz- MEIN AUTOOOO", "Ist das ein...", "BOOOMBOCLAT"],
-        "CUDDLE": ["MEIN SCHATZI", "DU ENGEL", "Ich brauche dich für immer"],
-        "NO_ENERGY": ["Digga bin tot", "nein vergiss es", "Später vll"],
-        "HUNGRY": ["Du nixgönner", "Ich würde selber kochen gerade wenn ich kein Tamagotchi wäre", "HUnger du idiot"],
-        "DEAD_LOVE": ["...  du liebst mich nicht."],
-        "DEAD_PLAY": ["...  du spielst nicht mit mir."],
-        "RESET": ["Hier kannst du unendlich resetten aber im echten leben gibt es mich nur einmal.."],
-    },
-}
+# Nächste Phase im Hintergrund laden, wenn der Phasenwechsel max. 2 Aktionen entfernt ist
+PRELOAD_XP_MARGIN = 2 * max(int(rule["xp"]) for rule in ACTION_RULES.values())
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("tamagotchi")
 
 
-def clamp(value: float, lo: int = 0, hi: int = 100) -> int:
-    return max(lo, min(hi, int(value)))
+def color_for_value(value: int):
+    if value >= GREEN_MIN:
+        return (60, 170, 90)
+    if value >= ORANGE_MIN:
+        return (200, 170, 60)
+    return (200, 80, 70)
+
 
+def bar_rect_for(top: int) -> pygame.Rect:
+    return pygame.Rect(120, top + 2, 180, 16)
 
-def xp_needed(level: int) -> int:
-    return 100 + (level - 1) * 25
 
+class Histogram:
+    """Kumulatives Histogramm im Prometheus-Sinn; ein Thread schreibt, der Metrics-Thread liest nur."""
 
-def apply_leveling(state: "GameState") -> None:
-    while state.level < 20 and state.xp >= xp_needed(state.level):
-        state.xp -= xp_needed(state.level)
-        state.level += 1
-        logger.info("Level up! New level: %s", state.level)
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
 
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
 
-def bar_color(value: int) -> str:
-    if value >= 70:
-        return "green"
-    if value >= 35:
-        return "orange"
-    return "red"
 
+class SaveStats:
+    """Anzahl, Fehler und Dauer der Schreibvorgänge je Art ("snapshot" = robust_save, "journal")."""
 
-def color_for_value(value: int):
-    if value >= 70:
-        return (60, 170, 90)
-    if value >= 35:
-        return (200, 170, 60)
-    return (200, 80, 70)
+    def __init__(self) -> None:
+        self.latency = {kind: Histogram(SAVE_BUCKETS_S) for kind in ("snapshot", "journal")}
+        self.failures = {kind: 0 for kind in self.latency}
+
+
+save_stats = SaveStats()
+
+
+def init_pygame() -> None:
+    """Startet nur die Subsysteme, die das Spiel nutzt; Mixer und Joystick kosten auf dem Pi Startzeit und RSS."""
+    if PYGAME_INIT == "full":
+        pygame.init()
+        return
+    pygame.display.init()
+    pygame.font.init()
+
+
+class StartupTimer:
+    """Dauer der Startphasen bis zum ersten Frame, einmal ins Log."""
+
+    def __init__(self) -> None:
+        self.last = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = [("import", IMPORT_S)]
+
+    def mark(self, phase: str, at: Optional[float] = None) -> None:
+        """Schließt die Phase seit dem letzten mark() ab (at: Endzeitpunkt als perf_counter())."""
+        at = time.perf_counter() if at is None else at
+        self.phases.append((phase, at - self.last))
+        self.last = at
+
+    def log(self) -> None:
+        total = sum(seconds for _, seconds in self.phases)
+        logger.info(
+            "Startup %.0fms to first frame: %s",
+            total * 1000,
+            ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases),
+        )
 
 
 def ensure_parent_dir(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
-def robust_save(state: "GameState") -> None:
+def fsync_dir(path: Path) -> None:
+    """Macht ein rename() im Verzeichnis dauerhaft (nicht auf Windows möglich)."""
+    if os.name == "nt":
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def robust_save(state: "GameState") -> bool:
+    """Schreibt den Snapshot atomar; False, wenn das fehlgeschlagen ist (wird nur geloggt)."""
     ensure_parent_dir(SAVE_PATH)
     tmp = SAVE_PATH.with_suffix(".tmp")
+    started = time.perf_counter()
     try:
-        tmp.write_text(json.dumps(asdict(state), indent=2), encoding="utf-8")
+        with tmp.open("w", encoding="utf-8") as fh:
+            fh.write(json.dumps(asdict(state), indent=2))
+            if SAVE_DURABILITY in ("file", "dir"):
+                fh.flush()
+                os.fsync(fh.fileno())
         tmp.replace(SAVE_PATH)
+        if SAVE_DURABILITY == "dir":
+            fsync_dir(SAVE_PATH.parent)
+        save_stats.latency["snapshot"].observe(time.perf_counter() - started)
         logger.info("Saved state to %s", SAVE_PATH)
+        return True
     except Exception:
+        save_stats.failures["snapshot"] += 1
         logger.exception("Failed to save state")
+        return False
 
 
 def load_state() -> "GameState":
@@ -155,22 +280,665 @@ def load_state() -> "GameState":
 
 
 @dataclass
-class GameState:
-    level: int = 1
-    xp: int = 0
-    hunger: int = 50
-    happiness: int = 50
-    love: int = 50
-    energy: int = 50
-    age_days: int = 0
-    dead: bool = False
+class JournalRecord:
+    kind: int
+    arg: int
+    state: "GameState"
+    time: float
+
+
+def encode_record(kind: int, arg: int, state: "GameState") -> bytes:
+    body = JOURNAL_RECORD.pack(
+        kind,
+        arg,
+        state.level,
+        state.hunger,
+        state.happiness,
+        state.love,
+        state.energy,
+        int(state.dead),
+        state.xp,
+        state.age_days,
+        state.saved_at,
+        0,
+    )[:-4]
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def read_journal(path: Path) -> Tuple[List[JournalRecord], int]:
+    """Alle gültigen Records + Länge des gültigen Teils; ein abgerissener Rest wird ignoriert."""
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return [], 0
+
+    records: List[JournalRecord] = []
+    size = JOURNAL_RECORD.size
+    offset = 0
+    while offset + size <= len(raw):
+        chunk = raw[offset : offset + size]
+        kind, arg, level, hunger, happiness, love, energy, dead, xp, age_days, wall_time, crc = (
+            JOURNAL_RECORD.unpack(chunk)
+        )
+        if crc != zlib.crc32(chunk[:-4]):
+            break
+        state = GameState(
+            level=level,
+            xp=xp,
+            hunger=hunger,
+            happiness=happiness,
+            love=love,
+            energy=energy,
+            age_days=age_days,
+            dead=bool(dead),
+            saved_at=wall_time,
+        )
+        records.append(JournalRecord(kind, arg, state, wall_time))
+        offset += size
+    return records, offset
+
+
+def persisted_fields(state: "GameState") -> Dict[str, Any]:
+    """Gespeicherter Inhalt ohne Zeitstempel, zum Erkennen unveränderter Saves."""
+    data = asdict(state)
+    data.pop("saved_at", None)
+    return data
+
+
+class JsonBackend:
+    """Klassisch: kompletter JSON-Snapshot per robust_save, nur der neueste zählt."""
+
+    history = False
+
+    def __init__(self) -> None:
+        self.last_written: Optional[Dict[str, Any]] = None
+
+    def load(self) -> "GameState":
+        return load_state()
+
+    def write(self, batch: List[Tuple[int, int, "GameState"]]) -> None:
+        if all(kind == EVENT_DECAY for kind, _, _ in batch):
+            return
+        snapshot = batch[-1][2]
+        # Gleicher Inhalt wie zuletzt geschrieben -> kein Schreiben, kein Log
+        data = persisted_fields(snapshot)
+        # nur nach Erfolg merken, sonst würde derselbe Zustand (z.B. aus close()) nie mehr geschrieben
+        if data != self.last_written and robust_save(snapshot):
+            self.last_written = data
+
+
+class JournalBackend:
+    """
+    Append-only: jedes Ereignis hängt einen Record fester Größe (voller Zustand) an
+    <save>.journal an. Alle JOURNAL_COMPACT_RECORDS Records bzw. JOURNAL_COMPACT_MS
+    wird der letzte Zustand als JSON-Snapshot geschrieben und das Journal nach
+    <save>.journal.1 rotiert (Verlauf der letzten Periode).
+    """
+
+    history = True
+
+    def __init__(self) -> None:
+        self.path = SAVE_PATH.with_suffix(".journal")
+        self.records_since_compact = 0
+        self.last_compact = time.monotonic()
+        self.last_state: Optional[Dict[str, Any]] = None
+
+    def load(self) -> "GameState":
+        state = load_state()
+        records, valid = read_journal(self.path)
+        if records:
+            state = records[-1].state
+        try:
+            if self.path.exists() and self.path.stat().st_size > valid:
+                logger.warning("Dropping torn journal tail in %s", self.path)
+                with self.path.open("r+b") as fh:
+                    fh.truncate(valid)
+        except OSError:
+            logger.exception("Failed to repair journal %s", self.path)
+        self.records_since_compact = len(records)
+        return state
+
+    def write(self, batch: List[Tuple[int, int, "GameState"]]) -> None:
+        payload = bytearray()
+        for kind, arg, snapshot in batch:
+            data = persisted_fields(snapshot)
+            if kind == RECORD_SAVE and data == self.last_state:
+                continue
+            payload += encode_record(kind, arg, snapshot)
+            self.last_state = data
+            self.records_since_compact += 1
+
+        if payload:
+            started = time.perf_counter()
+            try:
+                ensure_parent_dir(self.path)
+                created = not self.path.exists()
+                with self.path.open("ab") as fh:
+                    fh.write(payload)
+                    if SAVE_DURABILITY in ("file", "dir"):
+                        fh.flush()
+                        os.fsync(fh.fileno())
+                if created and SAVE_DURABILITY == "dir":
+                    fsync_dir(self.path.parent)
+            except Exception:
+                save_stats.failures["journal"] += 1
+                logger.exception("Failed to append to journal")
+                return
+            save_stats.latency["journal"].observe(time.perf_counter() - started)
+
+        due = (
+            self.records_since_compact >= JOURNAL_COMPACT_RECORDS
+            or (time.monotonic() - self.last_compact) * 1000 >= JOURNAL_COMPACT_MS
+        )
+        if due and self.records_since_compact:
+            self.compact(batch[-1][2])
+
+    def compact(self, state: "GameState") -> None:
+        # Snapshot zuerst: stirbt der Prozess vor dem Rotieren, endet das Journal auf genau diesem Zustand.
+        # Ohne Snapshot kein Rotieren, sonst steht der Zustand nur noch in .journal.1, das load() nicht liest;
+        # die Zähler bleiben, damit der nächste write() es erneut versucht.
+        if not robust_save(state):
+            return
+        try:
+            if self.path.exists():
+                self.path.replace(self.path.with_suffix(".journal.1"))
+                if SAVE_DURABILITY == "dir":
+                    fsync_dir(self.path.parent)
+        except Exception:
+            logger.exception("Failed to rotate journal")
+            return
+        logger.info("Compacted journal after %s records", self.records_since_compact)
+        self.records_since_compact = 0
+        self.last_compact = time.monotonic()
+
+
+class ReplayBackend:
+    """Für replay(): liefert den Anfangszustand aus dem Input-Log und schreibt nichts."""
+
+    history = False
+
+    def __init__(self, state: "GameState") -> None:
+        self.state = state
+
+    def load(self) -> "GameState":
+        return replace(self.state)
+
+    def write(self, batch: List[Tuple[int, int, "GameState"]]) -> None:
+        pass
 
-    @property
-    def current_phase(self) -> str:
-        for phase, levels in PHASES.items():
-            if self.level in levels:
-                return phase
-        return "adult"
+
+def make_save_backend() -> "JsonBackend | JournalBackend":
+    if SAVE_BACKEND == "journal":
+        return JournalBackend()
+    return JsonBackend()
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(raw: bytes, offset: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = raw[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class InputRecorder:
+    """
+    Schreibt jede Eingabe und jedes update() mit Zeitstempel in ein kompaktes Binär-Log
+    (1 Byte Kind + varint-Delta, ~2-3 Bytes pro Frame). Mit Seed, Startzeit und Anfangszustand
+    im Header ist das alles, wovon der Spielverlauf abhängt.
+    """
+
+    def __init__(self, path: Path, seed: int, started_at: float, start_ms: int, state: "GameState") -> None:
+        ensure_parent_dir(path)
+        self.fh = path.open("wb")
+        initial = json.dumps(asdict(state)).encode("utf-8")
+        self.fh.write(INPUT_LOG_HEADER.pack(INPUT_LOG_MAGIC, seed, started_at, start_ms, len(initial)) + initial)
+        self.buffer = bytearray()
+        self.last_ms = start_ms
+        logger.info("Recording input to %s (seed %s)", path, seed)
+
+    def _record(self, kind: int, now_ms: int) -> None:
+        self.buffer.append(kind)
+        _write_varint(self.buffer, now_ms - self.last_ms)
+        self.last_ms = now_ms
+
+    def event(self, now_ms: int, event: pygame.event.Event, woke: bool = False) -> None:
+        if woke:
+            # das Replay hat kein Backlight und würde den Touch sonst als Klick werten
+            self._record(INPUT_WAKE, now_ms)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self._record(INPUT_MOUSE, now_ms)
+            self.buffer += struct.pack("<Bhh", event.button, *event.pos)
+        elif event.type == pygame.KEYDOWN:
+            self._record(INPUT_KEY, now_ms)
+            _write_varint(self.buffer, event.key)
+        elif event.type == pygame.QUIT:
+            self._record(INPUT_QUIT, now_ms)
+
+    def tick(self, now_ms: int) -> None:
+        self._record(INPUT_TICK, now_ms)
+        if len(self.buffer) >= 4096:
+            self.flush()
+
+    def flush(self) -> None:
+        self.fh.write(self.buffer)
+        self.fh.flush()
+        self.buffer.clear()
+
+    def close(self, now_ms: int, final: Dict[str, Any]) -> None:
+        self._record(INPUT_END, now_ms)
+        data = json.dumps(final).encode("utf-8")
+        self.buffer += struct.pack("<H", len(data)) + data
+        self.flush()
+        self.fh.close()
+
+
+@dataclass
+class InputLog:
+    seed: int
+    started_at: float
+    start_ms: int
+    state: "GameState"
+    records: List[Tuple[int, int, Optional[pygame.event.Event]]]
+    final: Optional[Dict[str, Any]]
+
+
+def read_input_log(path: Path) -> InputLog:
+    """Liest ein Input-Log; bricht eine Aufnahme ab (Absturz), endet es ohne Endzustand."""
+    raw = path.read_bytes()
+    magic, seed, started_at, start_ms, state_len = INPUT_LOG_HEADER.unpack_from(raw)
+    if magic != INPUT_LOG_MAGIC:
+        raise ValueError(f"{path} is not an input log")
+    offset = INPUT_LOG_HEADER.size
+    state = GameState(**json.loads(raw[offset : offset + state_len]))
+    offset += state_len
+
+    records: List[Tuple[int, int, Optional[pygame.event.Event]]] = []
+    final = None
+    now_ms = start_ms
+    try:
+        while offset < len(raw):
+            kind = raw[offset]
+            delta, offset = _read_varint(raw, offset + 1)
+            now_ms += delta
+            event = None
+            if kind == INPUT_MOUSE:
+                button, x, y = struct.unpack_from("<Bhh", raw, offset)
+                offset += 5
+                event = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=(x, y))
+            elif kind == INPUT_KEY:
+                key, offset = _read_varint(raw, offset)
+                event = pygame.event.Event(pygame.KEYDOWN, key=key)
+            elif kind == INPUT_QUIT:
+                event = pygame.event.Event(pygame.QUIT)
+            elif kind == INPUT_END:
+                (length,) = struct.unpack_from("<H", raw, offset)
+                final = json.loads(raw[offset + 2 : offset + 2 + length])
+                break
+            records.append((kind, now_ms, event))
+    except (IndexError, struct.error, ValueError):
+        logger.warning("Input log %s ends with a torn record", path)
+    return InputLog(seed, started_at, start_ms, state, records, final)
+
+
+class SaveWriter:
+    """
+    Schreibt Saves in einem eigenen Thread, damit SD-Karten-I/O keine Frames kostet.
+    Alles, was seit dem letzten Schreiben eingereicht wurde, geht als ein Batch ans
+    Backend; das JSON-Backend schreibt davon nur den neuesten Snapshot.
+    """
+
+    def __init__(self, backend: "JsonBackend | JournalBackend") -> None:
+        self.backend = backend
+        self.cond = threading.Condition()
+        self.pending: List[Tuple[int, int, GameState]] = []
+        self.submitted = 0  # Nummer des letzten submit()
+        self.written = 0  # Nummer des zuletzt geschriebenen Snapshots
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, state: "GameState", kind: int = RECORD_SAVE, arg: int = 0) -> None:
+        snapshot = replace(state, saved_at=time.time())
+        with self.cond:
+            self.pending.append((kind, arg, snapshot))
+            self.submitted += 1
+            self.cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis alles bis zum letzten submit() auf der Karte ist."""
+        with self.cond:
+            target = self.submitted
+            return self.cond.wait_for(lambda: self.written >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        if not self.flush(timeout):
+            logger.warning("Save writer did not finish within %ss", timeout)
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: bool(self.pending) or self.closed)
+                if not self.pending:
+                    return
+                batch, number = self.pending, self.submitted
+                self.pending = []
+
+            try:
+                self.backend.write(batch)
+            except Exception:
+                logger.exception("Save backend failed")
+
+            with self.cond:
+                self.written = number
+                self.cond.notify_all()
+
+
+class DisplayOutput:
+    """Standard-Ausgabe über SDL; fbdev.FramebufferOutput hat dieselbe Schnittstelle."""
+
+    def __init__(self, surface: pygame.Surface) -> None:
+        self.surface = surface
+
+    def update(self, rects: List[pygame.Rect]) -> None:
+        pygame.display.update(rects)
+
+    def flip(self) -> None:
+        pygame.display.flip()
+
+    def close(self) -> None:
+        pass
+
+
+class Backlight:
+    """Helligkeit über sysfs; Fehler (z.B. fehlende Schreibrechte) werden nur geloggt."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.saved: Optional[int] = None
+
+    def dim(self, percent: int) -> None:
+        try:
+            current = int((self.path / "brightness").read_text(encoding="ascii"))
+            maximum = int((self.path / "max_brightness").read_text(encoding="ascii"))
+            target = maximum * percent // 100
+            if target < current:
+                (self.path / "brightness").write_text(str(target), encoding="ascii")
+                self.saved = current
+        except (OSError, ValueError):
+            logger.warning("Could not dim backlight %s", self.path, exc_info=True)
+
+    def restore(self) -> bool:
+        """Helligkeit von vor dim(); True, wenn gedimmt war."""
+        if self.saved is None:
+            return False
+        saved, self.saved = self.saved, None
+        try:
+            (self.path / "brightness").write_text(str(saved), encoding="ascii")
+        except OSError:
+            logger.warning("Could not restore backlight %s", self.path, exc_info=True)
+        return True
+
+
+class FrameStats:
+    """Dauer jeder Loop-Phase (ms) der letzten FRAME_STATS_SIZE Frames; "frame" = alles außer sleep."""
+
+    def __init__(self, size: int = FRAME_STATS_SIZE) -> None:
+        self.samples: Dict[str, "deque[float]"] = {
+            phase: deque(maxlen=size) for phase in ("frame",) + FRAME_PHASES
+        }
+        # dasselbe seit Start, für den Metrics-Endpoint
+        self.histograms = {phase: Histogram(FRAME_BUCKETS_S) for phase in self.samples}
+        self.frames = 0
+
+    def record(self, events: float, update: float, draw: float, flip: float, sleep: float) -> None:
+        """Zeiten in Sekunden (perf_counter-Differenzen)."""
+        samples = self.samples
+        samples["events"].append(events * 1000)
+        samples["update"].append(update * 1000)
+        samples["draw"].append(draw * 1000)
+        samples["flip"].append(flip * 1000)
+        samples["sleep"].append(sleep * 1000)
+        samples["frame"].append((events + update + draw + flip) * 1000)
+        histograms = self.histograms
+        histograms["events"].observe(events)
+        histograms["update"].observe(update)
+        histograms["draw"].observe(draw)
+        histograms["flip"].observe(flip)
+        histograms["sleep"].observe(sleep)
+        histograms["frame"].observe(events + update + draw + flip)
+        self.frames += 1
+
+    def percentiles(self) -> Dict[str, Tuple[float, float, float]]:
+        """p50/p95/p99 je Phase (nearest rank)."""
+        result = {}
+        for phase, values in self.samples.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            last = len(ordered) - 1
+            result[phase] = tuple(ordered[min(last, int(q * len(ordered)))] for q in (0.50, 0.95, 0.99))
+        return result  # type: ignore[return-value]
+
+    def rows(self) -> List[Tuple[str, ...]]:
+        return [
+            (phase, f"{p50:.2f}", f"{p95:.2f}", f"{p99:.2f}") for phase, (p50, p95, p99) in self.percentiles().items()
+        ]
+
+
+class FontRegistry:
+    """Prozessweite Font-Objekte je (Datei, Größe); die Font-Datei wird einmal aufgelöst."""
+
+    def __init__(self, setting: str = FONT_FILE) -> None:
+        self.setting = setting
+        self._path: Optional[str] = None
+        self._resolved = False
+        self.fonts: Dict[Tuple[Optional[str], int], pygame.font.Font] = {}
+
+    def path(self) -> Optional[str]:
+        """TAMAGO_FONT, falls vorhanden; None = pygame-Default (dasselbe, was SysFont(None) liefert)."""
+        if not self._resolved:
+            self._resolved = True
+            if self.setting:
+                if Path(self.setting).is_file():
+                    self._path = self.setting
+                else:
+                    logger.warning("Font %s not found, using pygame's default font", self.setting)
+        return self._path
+
+    def get(self, size: int) -> pygame.font.Font:
+        key = (self.path(), size)
+        font = self.fonts.get(key)
+        if font is None:
+            if not self.fonts:
+                # Font-Objekte überleben pygame.quit() nicht
+                pygame.register_quit(self.fonts.clear)
+            font = pygame.font.Font(key[0], size)
+            self.fonts[key] = font
+        return font
+
+
+fonts = FontRegistry()
+
+
+def optimize_surface(
+    surface: pygame.Surface, backdrop: Optional[pygame.Surface] = None
+) -> Tuple[pygame.Surface, str]:
+    """
+    Wählt das billigste Blit-Format ohne sichtbaren Unterschied; liefert (Surface, Modus):
+      "opaque"     komplett deckend -> convert()
+      "colorkey"   Alpha nur 0/255 -> Colorkey + RLEACCEL
+      "flattened"  echtes Alpha, aber backdrop (gleich groß, deckend) zeigt, was darunter
+                   liegt -> vorab darauf geblendet, danach deckend
+      "alpha"      unverändert (Alpha-Blending bei jedem Blit)
+    """
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert(), "opaque"
+    width, height = surface.get_size()
+    alpha = pygame.image.tobytes(surface, "RGBA")[3::4]
+    solid = alpha.count(255)
+    if solid == width * height:
+        return surface.convert(), "opaque"
+    if solid + alpha.count(0) == width * height:
+        keyed = pygame.Surface((width, height)).convert()
+        keyed.fill(COLORKEY)
+        keyed.blit(surface, (0, 0))
+        # Ein deckendes Pixel in der Schlüsselfarbe würde sonst durchsichtig
+        if pygame.mask.from_threshold(keyed, COLORKEY, (1, 1, 1, 255)).count() == width * height - solid:
+            keyed.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            return keyed, "colorkey"
+    if backdrop is not None:
+        flat = backdrop.copy()
+        flat.blit(surface, (0, 0))
+        return flat, "flattened"
+    return surface, "alpha"
+
+
+class TextCache:
+    """LRU-Cache für font.render(), Key = (font, text, color, backdrop)."""
+
+    def __init__(self, max_entries: int = TEXT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # gewählter Blit-Modus je gerenderter Surface (siehe optimize_surface)
+        self.modes: Dict[str, int] = {}
+
+    def render(
+        self,
+        font: pygame.font.Font,
+        text: str,
+        color: Tuple[int, int, int],
+        backdrop: Optional[Tuple[pygame.Surface, Tuple[int, int]]] = None,
+    ) -> pygame.Surface:
+        """backdrop = (Layer, Position): der Text landet immer genau dort auf diesem Layer."""
+        key = (font, text, color, backdrop)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = font.render(text, True, color)
+        under = None
+        if backdrop is not None:
+            layer, pos = backdrop
+            rect = pygame.Rect(pos, surf.get_size())
+            if layer.get_rect().contains(rect):
+                under = layer.subsurface(rect)
+        surf, mode = optimize_surface(surf, under)
+        self.modes[mode] = self.modes.get(mode, 0) + 1
+        self.entries[key] = surf
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surf
+
+
+def surface_byte_format(surface: pygame.Surface) -> str:
+    """tobytes/frombuffer-Format, das dem Speicherlayout der Surface entspricht."""
+    masks = tuple(surface.get_masks())
+    if surface.get_bitsize() == 32 and sys.byteorder == "little":
+        if masks == (0xFF0000, 0xFF00, 0xFF, 0xFF000000):
+            return "BGRA"
+        if masks == (0xFF, 0xFF00, 0xFF0000, 0xFF000000):
+            return "RGBA"
+    return "RGBA"
+
+
+class SpriteDiskCache:
+    """
+    Ein Eintrag pro Name (Dateiname = sha1 des Namens), Inhalt = Header + Rohpixel.
+    Der Stamp im Header deckt Pfad, mtime und Größe aller Quellen sowie SPRITE_SIZE ab;
+    passt er nicht mehr, ist der Eintrag ungültig und wird beim nächsten store() ersetzt.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+        self._native_format: Optional[str] = None
+
+    def _entry_path(self, name: str) -> Path:
+        return self.root / (hashlib.sha1(name.encode("utf-8")).hexdigest() + ".raw")
+
+    def _stamp(self, sources: List[Path], fmt: str) -> bytes:
+        digest = hashlib.sha1(f"{SPRITE_SIZE}:{fmt}".encode("ascii"))
+        for source in sources:
+            try:
+                st = source.stat()
+                digest.update(f"|{source.resolve()}:{st.st_mtime_ns}:{st.st_size}".encode("utf-8"))
+            except OSError:
+                digest.update(f"|{source}:missing".encode("utf-8"))
+        return digest.digest()
+
+    def load(self, name: str, sources: List[Path]) -> Optional[pygame.Surface]:
+        path = self._entry_path(name)
+        try:
+            with path.open("rb") as fh:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        try:
+            magic, stamp, width, height, raw_fmt = SPRITE_CACHE_HEADER.unpack_from(mm)
+            fmt = raw_fmt.rstrip(b"\0").decode("ascii")
+            pixels = memoryview(mm)[SPRITE_CACHE_HEADER.size :]
+            if (
+                magic != SPRITE_CACHE_MAGIC
+                or stamp != self._stamp(sources, fmt)
+                or len(pixels) != width * height * 4
+            ):
+                self.misses += 1
+                return None
+            surf = pygame.image.frombuffer(pixels, (width, height), fmt)
+        except Exception:
+            logger.warning("Ignoring unreadable sprite cache entry %s", path)
+            self.misses += 1
+            return None
+
+        # Nicht im Display-Format gespeichert -> einmal konvertieren
+        if fmt != self.native_format():
+            surf = surf.convert_alpha()
+        self.hits += 1
+        return surf
+
+    def native_format(self) -> str:
+        if self._native_format is None:
+            probe = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+            self._native_format = surface_byte_format(probe)
+        return self._native_format
+
+    def store(self, name: str, sources: List[Path], surface: pygame.Surface) -> None:
+        path = self._entry_path(name)
+        fmt = surface_byte_format(surface)
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            width, height = surface.get_size()
+            header = SPRITE_CACHE_HEADER.pack(
+                SPRITE_CACHE_MAGIC, self._stamp(sources, fmt), width, height, fmt.encode("ascii")
+            )
+            tmp.write_bytes(header + pygame.image.tobytes(surface, fmt))
+            tmp.replace(path)
+        except Exception:
+            logger.warning("Failed to write sprite cache entry for %s", name)
 
 
 class SpriteManager:
@@ -186,51 +954,195 @@ class SpriteManager:
       idle_3.png (secret idle)
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        disk_cache: Optional[SpriteDiskCache] = None,
+        atlas: bool = False,
+        backdrop: Optional[Tuple[int, int, int]] = None,
+    ) -> None:
+        self.disk_cache = disk_cache
+        self.atlas = atlas
+        # Farbe, über der Sprites immer gezeichnet werden (None = Alpha behalten)
+        self.backdrop = backdrop
+        # Blit-Modus je Sprite bzw. Atlas (siehe optimize_surface); nur vom Render-Thread
+        # geschrieben, Preloads liefern ihre Modi mit den Frames und load_phase() übernimmt sie
+        self.surface_modes: Dict[str, str] = {}
         # cache[phase][action] = list[Surface] (1..n frames)
         self.cache: Dict[str, Dict[str, List[pygame.Surface]]] = {}
+        # laufende Hintergrund-Loads; nur vom Render-Thread angefasst
+        self.preloads: Dict[str, "Future[Tuple[Dict[str, List[pygame.Surface]], Dict[str, str]]]"] = {}
+        self.executor: "Optional[ThreadPoolExecutor]" = None
+        # Pixel-Speicher aller geladenen Phasen (Atlas nur einmal gezählt), für /metrics
+        self.memory_bytes = 0
+        # auch vom Preload-Thread genutzt, daher mit Lock
+        self.placeholders: Dict[Tuple[str, bool], pygame.Surface] = {}
+        self.placeholders_lock = threading.Lock()
+
+    def _optimize(self, name: str, surface: pygame.Surface, modes: Dict[str, str]) -> pygame.Surface:
+        backdrop = None
+        if self.backdrop is not None:
+            backdrop = pygame.Surface(surface.get_size()).convert()
+            backdrop.fill(self.backdrop)
+        surface, mode = optimize_surface(surface, backdrop)
+        modes[name] = mode
+        logger.debug("Sprite %s: %s", name, mode)
+        return surface
+
+    def _placeholder(self, label: str, modes: Dict[str, str], optimize: bool = True) -> pygame.Surface:
+        with self.placeholders_lock:
+            surf = self.placeholders.get((label, optimize))
+            if surf is not None:
+                return surf
+            surf = pygame.Surface((SPRITE_SIZE, SPRITE_SIZE), pygame.SRCALPHA)
+            surf.fill((60, 60, 80))
+            pygame.draw.rect(surf, (220, 220, 220), surf.get_rect(), 2)
+            txt = fonts.get(18).render(label, True, (255, 255, 255))
+            surf.blit(txt, txt.get_rect(center=surf.get_rect().center))
+            if optimize:
+                surf = self._optimize(f"placeholder:{label}", surf, modes)
+            self.placeholders[(label, optimize)] = surf
+            return surf
+
+    def _load_image(
+        self, path: Path, modes: Dict[str, str], use_disk_cache: bool = True, optimize: bool = True
+    ) -> pygame.Surface:
+        use_disk_cache = use_disk_cache and self.disk_cache is not None
+        img = self.disk_cache.load(str(path), [path]) if use_disk_cache else None
+        if img is None:
+            try:
+                img = pygame.image.load(str(path)).convert_alpha()
+                img = pygame.transform.smoothscale(img, (SPRITE_SIZE, SPRITE_SIZE))
+            except Exception:
+                logger.warning("Missing sprite: %s", path)
+                return self._placeholder(path.stem, modes, optimize)
 
-    def _placeholder(self, label: str) -> pygame.Surface:
-        surf = pygame.Surface((SPRITE_SIZE, SPRITE_SIZE), pygame.SRCALPHA)
-        surf.fill((60, 60, 80))
-        pygame.draw.rect(surf, (220, 220, 220), surf.get_rect(), 2)
-        font = pygame.font.SysFont(None, 18)
-        txt = font.render(label, True, (255, 255, 255))
-        surf.blit(txt, txt.get_rect(center=surf.get_rect().center))
-        return surf
-
-    def _load_image(self, path: Path) -> pygame.Surface:
-        try:
-            img = pygame.image.load(str(path)).convert_alpha()
-            img = pygame.transform.smoothscale(img, (SPRITE_SIZE, SPRITE_SIZE))
-            return img
-        except Exception:
-            logger.warning("Missing sprite: %s", path)
-            return self._placeholder(path.stem)
-
-    def load_phase(self, phase: str) -> None:
-        if phase in self.cache:
-            return
+            # Im Cache liegt das skalierte Alpha-Bild; optimiert wird nach jedem Laden
+            if use_disk_cache:
+                self.disk_cache.store(str(path), [path], img)
+        return self._optimize(str(path), img, modes) if optimize else img
 
-        frames: Dict[str, List[pygame.Surface]] = {}
+    def _phase_slots(self, phase: str) -> List[Tuple[str, Path]]:
+        """(action, Datei) in Frame-Reihenfolge; bestimmt auch das Atlas-Layout."""
         phase_dir = SPRITES_DIR / phase
+        slots: List[Tuple[str, Path]] = []
 
         # 2-frame actions
         for action in ACTIONS_2FR:
-            frames[action] = [
-                self._load_image(phase_dir / f"{action}_1.png"),
-                self._load_image(phase_dir / f"{action}_2.png"),
-            ]
+            slots.append((action, phase_dir / f"{action}_1.png"))
+            slots.append((action, phase_dir / f"{action}_2.png"))
 
         # secret idle_3 (optional, only if exists)
         idle3 = phase_dir / "idle_3.png"
         if idle3.exists():
-            frames["idle"].append(self._load_image(idle3))  # index 2
+            slots.append(("idle", idle3))  # index 2
 
         # dead is a single file per phase
-        frames["dead"] = [self._load_image(phase_dir / "dead.png")]
+        slots.append(("dead", phase_dir / "dead.png"))
+        return slots
+
+    def _build_phase(self, phase: str) -> Tuple[Dict[str, List[pygame.Surface]], Dict[str, str]]:
+        """(Frames, Blit-Modi); läuft auch im Preload-Thread und fasst surface_modes nicht an."""
+        slots = self._phase_slots(phase)
+        modes: Dict[str, str] = {}
+        if self.atlas:
+            return self._build_atlas(phase, slots, modes), modes
+
+        frames: Dict[str, List[pygame.Surface]] = {}
+        for action, path in slots:
+            frames.setdefault(action, []).append(self._load_image(path, modes))
+        return frames, modes
+
+    def _build_atlas(
+        self, phase: str, slots: List[Tuple[str, Path]], modes: Dict[str, str]
+    ) -> Dict[str, List[pygame.Surface]]:
+        """Alle Frames einer Phase in einer Surface, frame() liefert Subsurfaces daraus."""
+        sources = [path for _, path in slots]
+        name = f"atlas:{phase}"
+        atlas = self.disk_cache.load(name, sources) if self.disk_cache is not None else None
+
+        rects = [
+            pygame.Rect(
+                (i % ATLAS_COLUMNS) * SPRITE_SIZE, (i // ATLAS_COLUMNS) * SPRITE_SIZE, SPRITE_SIZE, SPRITE_SIZE
+            )
+            for i in range(len(slots))
+        ]
+        if atlas is None:
+            rows = -(-len(slots) // ATLAS_COLUMNS)
+            atlas = pygame.Surface((ATLAS_COLUMNS * SPRITE_SIZE, rows * SPRITE_SIZE), pygame.SRCALPHA).convert_alpha()
+            atlas.fill((0, 0, 0, 0))
+            for (_, path), rect in zip(slots, rects):
+                # MAX auf transparentes Schwarz = exakte Kopie inkl. Alpha
+                image = self._load_image(path, modes, use_disk_cache=False, optimize=False)
+                atlas.blit(image, rect, special_flags=pygame.BLEND_RGBA_MAX)
+            if self.disk_cache is not None:
+                self.disk_cache.store(name, sources, atlas)
+
+        atlas = self._optimize(name, atlas, modes)
+        frames: Dict[str, List[pygame.Surface]] = {}
+        for (action, _), rect in zip(slots, rects):
+            frame = atlas.subsurface(rect)
+            if atlas.get_colorkey() is not None:
+                # Subsurfaces erben den Colorkey, aber nicht die RLE-Kodierung
+                frame.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            frames.setdefault(action, []).append(frame)
+        return frames
+
+    def load_phase(self, phase: str) -> None:
+        if phase in self.cache:
+            return
 
+        built: Optional[Tuple[Dict[str, List[pygame.Surface]], Dict[str, str]]] = None
+        future = self.preloads.pop(phase, None)
+        # Noch nicht gestartet -> abbrechen und selbst laden; läuft er schon, ist Warten billiger
+        if future is not None and (future.done() or not future.cancel()):
+            if not future.done():
+                logger.info("Preload of phase %s not finished yet, waiting", phase)
+            try:
+                built = future.result()
+            except Exception:
+                logger.exception("Preload of phase %s failed", phase)
+
+        if built is None:
+            built = self._build_phase(phase)
+        frames, modes = built
         self.cache[phase] = frames
+        self.surface_modes.update(modes)
+        counts: Dict[str, int] = {}
+        for name, mode in modes.items():
+            if f"/{phase}/" in name or name == f"atlas:{phase}":
+                counts[mode] = counts.get(mode, 0) + 1
+        logger.info("Sprites for phase %s: %s", phase, ", ".join(f"{n} {m}" for m, n in sorted(counts.items())))
+        self.memory_bytes = self._pixel_bytes()
+
+    def _pixel_bytes(self) -> int:
+        seen = set()
+        total = 0
+        for frames in self.cache.values():
+            for surfaces in frames.values():
+                for surf in surfaces:
+                    # Subsurfaces teilen sich die Pixel mit dem Atlas
+                    owner = surf.get_parent() or surf
+                    if id(owner) not in seen:
+                        seen.add(id(owner))
+                        total += owner.get_width() * owner.get_height() * owner.get_bytesize()
+        return total
+
+    def preload(self, phase: str) -> None:
+        """Lädt eine Phase in einem Worker-Thread; load_phase() übernimmt das Ergebnis."""
+        if phase in self.cache or phase in self.preloads:
+            return
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sprite-preload")
+        logger.info("Preloading sprites for phase %s", phase)
+        self.preloads[phase] = self.executor.submit(self._build_phase, phase)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.preloads.clear()
 
     def frame(self, phase: str, action: str, index: int) -> pygame.Surface:
         self.load_phase(phase)
@@ -238,7 +1150,7 @@ class SpriteManager:
             action = "idle"
         action_frames = self.cache[phase][action]
         if not action_frames:
-            return self._placeholder(f"{phase}:{action}")
+            return self._placeholder(f"{phase}:{action}", self.surface_modes)
         if len(action_frames) == 1:
             return action_frames[0]
         # wrap index for safety
@@ -251,34 +1163,70 @@ class SpriteManager:
 
 
 class Game:
-    def __init__(self) -> None:
-        pygame.init()
+    def __init__(
+        self,
+        backend: "JsonBackend | JournalBackend | ReplayBackend | None" = None,
+        ticks: Optional[VirtualClock] = None,
+        seed: Optional[int] = None,
+        started_at: Optional[float] = None,
+        record_path: str = RECORD_PATH,
+        headless: bool = False,
+    ) -> None:
+        # headless (replay): keine Wirkung nach außen, also kein Framebuffer, Sprite-Cache,
+        # Metrics-Endpoint, Backlight oder Shutdown
+        self.startup: Optional[StartupTimer] = StartupTimer()
+        init_pygame()
         pygame.display.set_caption("Tamagotchi")
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        # SDL-Fenster bleibt auch mit Framebuffer-Ausgabe offen: Events, convert()
+        self.output: "DisplayOutput | FramebufferOutput" = DisplayOutput(pygame.display.set_mode((WIDTH, HEIGHT)))
+        if FBDEV_PATH and not headless:
+            try:
+                import fbdev
+
+                self.output = fbdev.FramebufferOutput(FBDEV_PATH, (WIDTH, HEIGHT))
+                logger.info("Rendering offscreen into framebuffer %s", FBDEV_PATH)
+            except (ImportError, OSError, ValueError):
+                logger.exception("Could not open framebuffer %s, using the SDL display", FBDEV_PATH)
+        self.screen = self.output.surface
+        # startet auch den SDL-Timer, ohne den get_ticks() bei "minimal" 0 liefert
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 22)
-        self.small_font = pygame.font.SysFont(None, 18)
-
-        self.state = load_state()
-        self.sprites = SpriteManager()
+        self.loop_mode = LOOP_MODE
+        self.startup.mark("display")
+        self.font = fonts.get(22)
+        self.small_font = fonts.get(18)
+        self.text = TextCache()
+        self.startup.mark("fonts")
+
+        # Spielzeit: einmal pro Schleifendurchlauf gestellt (run), damit Eingaben und
+        # update() eines Frames dieselbe Zeit sehen und ein Replay exakt dieselben Werte hat
+        self.ticks = ticks if ticks is not None else VirtualClock(pygame.time.get_ticks())
+        if seed is None:
+            seed = int(SEED) if SEED else int.from_bytes(os.urandom(8), "little")
+        if started_at is None:
+            started_at = time.time()
+        self.shutdown_command: Optional[List[str]] = None if headless else ["sudo", "shutdown", "-h", "now"]
+
+        backend = backend if backend is not None else make_save_backend()
+        self.saver = SaveWriter(backend)
+        initial = backend.load()
+        self.startup.mark("load_state")
+        self.recorder = (
+            InputRecorder(Path(record_path), seed, started_at, self.ticks(), initial) if record_path else None
+        )
+        self.sim = Simulation(
+            initial,
+            clock=self.ticks,
+            rng=random.Random(seed),
+            wall_clock=lambda: started_at,
+            on_event=self.persist,
+        )
+        self.saved_version = self.state.version
+        disk_cache = SpriteDiskCache(SAVE_PATH.parent / "sprite_cache") if SPRITE_CACHE and not headless else None
+        # Hinter SPRITE_RECT liegt im Background-Layer nur BG_COLOR
+        self.sprites = SpriteManager(disk_cache, atlas=SPRITE_ATLAS, backdrop=BG_COLOR)
 
         self.running = True
-        self.current_action = "idle"
-        self.frame_index = 0
-        self.next_frame_change_ms = pygame.time.get_ticks() + IDLE_FRAME_MS
-        self.locked = False
-
-        self.last_autosave_ms = pygame.time.get_ticks()
-        self.last_decay_ms = pygame.time.get_ticks()
-
-        # Energy float for accurate regen timings
-        self.energy_float = float(self.state.energy)
-        self.last_energy_update_ms = pygame.time.get_ticks()
-
-        self.hunger_warning_shown = False
-
-        self.status_message = ""
-        self.status_message_until_ms = 0
+        self.last_autosave_ms = self.ticks()
 
         self.buttons = {
             "FEED": pygame.Rect(10, 420, 70, 45),
@@ -288,293 +1236,276 @@ class Game:
         }
         self.power_button = pygame.Rect(255, 8, 58, 24)
 
-    def set_status(self, msg: str, ms: int = DEFAULT_DIALOG_MS) -> None:
-        self.status_message = msg
-        self.status_message_until_ms = pygame.time.get_ticks() + ms
-
-    def say(self, key: str, ms: int = DEFAULT_DIALOG_MS) -> None:
-        phase = self.state.current_phase
-        options = DIALOG.get(phase, {}).get(key, [])
-        if not options:
-            self.set_status(key, ms)
-            return
-        self.set_status(random.choice(options), ms)
+        self.sim.catch_up_offline()
 
-    def reset_game(self) -> None:
-        self.state = GameState()
-        self.energy_float = float(self.state.energy)
-        self.last_energy_update_ms = pygame.time.get_ticks()
+        # Dirty-Rect-Renderer: letzter gezeichneter Key je Region
+        self.full_redraw = FULL_REDRAW
+        self.region_keys: Dict[str, tuple] = {}
+        self.needs_full_redraw = True
+
+        # Background-Layer je (dead, disabled-Buttons)
+        self.backgrounds: Dict[tuple, pygame.Surface] = {}
+
+        # Frame-Zeiten je Loop-Phase; Overlay per F3 oder langem Druck aufs Sprite
+        self.frame_stats = FrameStats()
+        self.show_frame_stats = False
+        self.overlay_rows: List[Tuple[str, ...]] = []
+        self.overlay_updated_ms = 0
+        self.press_started_ms: Optional[int] = None
+        self.last_flip_s = 0.0
+        self.last_frame_summary_ms = self.ticks()
 
-        self.current_action = "idle"
-        self.locked = False
-        self.frame_index = 0
-        self.next_frame_change_ms = pygame.time.get_ticks() + IDLE_FRAME_MS
+        # Stromsparmodus nach IDLE_MINUTES ohne Eingabe
+        self.idle_after_ms = int(IDLE_MINUTES * 60_000)
+        self.last_input_ms = self.ticks()
+        self.power_save = False
+        self.backlight = Backlight(BACKLIGHT_PATH) if BACKLIGHT_PATH and not headless else None
 
-        self.hunger_warning_shown = False
+        self.metrics = None
+        if METRICS_ADDRESS and not headless:
+            from metrics import MetricsServer
 
-        robust_save(self.state)
-        self.say("RESET", 3000)
+            try:
+                self.metrics = MetricsServer(self, save_stats, METRICS_ADDRESS)
+                logger.info("Serving metrics on %s", METRICS_ADDRESS)
+            except (OSError, ValueError):
+                logger.exception("Could not start metrics endpoint on %s", METRICS_ADDRESS)
+        self.startup.mark("setup")
+
+        # Sprites der aktuellen Phase gleich hier, erst danach die nächste im Hintergrund
+        self.sprites.load_phase(self.state.current_phase)
+        self.startup.mark("load_phase")
+        self.maybe_preload_next_phase()
+
+    @property
+    def state(self) -> GameState:
+        return self.sim.state
+
+    def save(self) -> None:
+        self.persist(RECORD_SAVE)
+
+    def persist(self, kind: int, arg: int = 0) -> None:
+        # Decay-Ticks landen nur in Backends mit Verlauf, sonst reicht der Autosave
+        if kind == EVENT_DECAY and not self.saver.backend.history:
+            return
+        self.saver.submit(self.state, kind, arg)
+        self.saved_version = self.state.version
+
+    def set_status(self, msg: str, ms: int = DEFAULT_DIALOG_MS) -> None:
+        self.sim.set_status(msg, ms)
+
+    def reset_game(self) -> None:
+        self.sim.reset()
 
     def effective_action_for_sprite(self) -> str:
         if self.state.dead:
             return "dead"
         # no_energy idle: wenn idle und nicht genug für PLAY/CUDDLE (10)
-        if self.current_action == "idle" and self.state.energy < 10:
+        if self.sim.current_action == "idle" and self.state.energy < 10:
             return "no_energy"
-        return self.current_action
+        return self.sim.current_action
 
     def use_secret_idle3(self) -> bool:
         # ✅ nur Level 10-14 (= teen) + voller Hunger
         return (
             self.state.current_phase == "teen"
             and self.state.hunger >= 100
-            and self.current_action == "idle"
+            and self.sim.current_action == "idle"
             and not self.state.dead
             and self.sprites.has_idle3("teen")
         )
 
-    def energy_fill_minutes(self) -> float:
-        """0 -> 100 in X Minuten abhängig von Farben (Hunger/Happiness/Love)."""
-        hunger = self.state.hunger
-        happiness = self.state.happiness
-        love = self.state.love
-
-        if hunger <= 0:
-            return 60.0
-        if hunger < 35:
-            return 20.0
-
-        colors = [bar_color(hunger), bar_color(happiness), bar_color(love)]
-        orange_count = sum(1 for c in colors if c == "orange")
-
-        if all(c == "green" for c in colors):
-            return 7.5
-        if orange_count == 1:
-            return 10.0
-        if orange_count >= 2:
-            return 12.5
-
-        # fallback (z.B. love/happy rot, hunger aber nicht rot)
-        return 12.5
-
-    def update_energy(self) -> None:
-        """Kontinuierliche Energy-Regeneration, nur idle + nicht locked + nicht dead."""
-        now = pygame.time.get_ticks()
-        dt_ms = now - self.last_energy_update_ms
-        self.last_energy_update_ms = now
-
-        if self.state.dead:
-            return
-        if self.current_action != "idle" or self.locked:
-            return
-        if self.state.energy >= 100:
-            self.energy_float = 100.0
-            return
-
-        minutes = self.energy_fill_minutes()
-        rate_per_ms = 100.0 / (minutes * 60_000.0)
-
-        self.energy_float = min(100.0, self.energy_float + rate_per_ms * dt_ms)
-        new_energy = clamp(self.energy_float)
-        if new_energy != self.state.energy:
-            self.state.energy = new_energy
+    def next_deadline_ms(self) -> int:
+        """Frühester Zeitpunkt (ticks), an dem update() etwas Sichtbares ändert."""
+        # Erster Frame bzw. invalidate(): sofort zeichnen, nicht erst auf Input oder MAX_WAIT_MS warten
+        if self.needs_full_redraw:
+            return self.ticks()
+        deadline = min(self.sim.next_deadline_ms(), self.last_autosave_ms + AUTOSAVE_MS)
+        if self.idle_after_ms and not self.power_save:
+            deadline = min(deadline, self.last_input_ms + self.idle_after_ms)
+        return deadline
+
+    def enter_power_save(self) -> None:
+        logger.info("No input for %g min, entering power save", self.idle_after_ms / 60_000)
+        self.power_save = True
+        self.sim.set_idle_frame_ms(POWER_SAVE_FRAME_MS or NEVER_MS)
+        if self.backlight is not None:
+            self.backlight.dim(IDLE_BRIGHTNESS)
+
+    def leave_power_save(self) -> bool:
+        """Zurück auf volle Rate; True, wenn das Display gedimmt war."""
+        logger.info("Input received, leaving power save")
+        self.power_save = False
+        self.sim.set_idle_frame_ms(IDLE_FRAME_MS)
+        return self.backlight is not None and self.backlight.restore()
+
+    def wake(self) -> bool:
+        """Eingabe merken und ggf. den Stromsparmodus verlassen; True, wenn das Display gedimmt war."""
+        self.last_input_ms = self.ticks()
+        return self.power_save and self.leave_power_save()
 
     def handle_action(self, action: str) -> None:
-        if self.state.dead:
-            if action == "RESET":
-                self.reset_game()
-            return
-
-        if action == "RESET":
-            return
+        self.sim.handle_action(action)
+        self.maybe_preload_next_phase()
 
-        rule = ACTION_RULES.get(action)
-        if not rule:
+    def maybe_preload_next_phase(self) -> None:
+        level = self.state.level
+        # tot gibt es keine XP mehr, nur Reset zurück zu baby
+        if self.state.dead or level >= 20:
             return
-
-        cost = int(rule.get("cost", 0))
-        if self.state.energy < cost:
-            self.say("NO_ENERGY", 2600)
+        next_phase = phase_for_level(level + 1)
+        if next_phase == self.state.current_phase:
             return
+        if xp_needed(level) - self.state.xp <= PRELOAD_XP_MARGIN:
+            self.sprites.preload(next_phase)
 
-        # Pay cost
-        self.energy_float = float(self.state.energy)
-        self.state.energy = clamp(self.state.energy - cost)
-        self.energy_float = float(self.state.energy)
-
-        # Apply effects
-        self.state.hunger = clamp(self.state.hunger + int(rule.get("hunger", 0)))
-        self.state.happiness = clamp(self.state.happiness + int(rule.get("happiness", 0)))
-        self.state.love = clamp(self.state.love + int(rule.get("love", 0)))
-        self.state.xp += int(rule.get("xp", 0))
-
-        self.start_animation(str(rule.get("anim", "idle")))
-        self.say(action, DEFAULT_DIALOG_MS)
-
-        apply_leveling(self.state)
-        robust_save(self.state)
-
-    def start_animation(self, action: str) -> None:
-        self.locked = True
-        self.current_action = action
-        self.frame_index = 0
-        self.next_frame_change_ms = pygame.time.get_ticks() + random.randint(*ACTION_FRAME_MS)
-
-    def handle_event(self, event: pygame.event.Event) -> None:
+    def handle_event(self, event: pygame.event.Event) -> bool:
+        """Verarbeitet ein Event; True, wenn es nur das gedimmte Display geweckt hat."""
         if event.type == pygame.QUIT:
             self.running = False
-            return
+            return False
+
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.invalidate()
+            return False
+
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+            # Auf dem gedimmten Display weckt der erste Touch nur auf, statt blind einen Button zu treffen
+            if self.wake() and event.type == pygame.MOUSEBUTTONDOWN:
+                return True
 
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 self.running = False
-                return
+                return False
+            if event.key == pygame.K_F3:
+                self.toggle_frame_stats()
+                return False
             if event.key == pygame.K_r and self.state.dead:
                 self.reset_game()
-                return
+                return False
+
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            started, self.press_started_ms = self.press_started_ms, None
+            if started is not None and SPRITE_RECT.collidepoint(event.pos):
+                if self.ticks() - started >= LONG_PRESS_MS:
+                    self.toggle_frame_stats()
+            return False
 
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             pos = event.pos
+            if SPRITE_RECT.collidepoint(pos):
+                self.press_started_ms = self.ticks()
 
             if self.power_button.collidepoint(pos):
                 self.shutdown_sequence()
-                return
+                return False
 
-            if self.locked:
-                return
+            if self.sim.locked:
+                return False
 
             if self.state.dead:
                 if self.buttons["RESET"].collidepoint(pos):
                     self.reset_game()
-                return
+                return False
 
             for name in ("FEED", "PLAY", "CUDDLE"):
                 if self.buttons[name].collidepoint(pos):
                     self.handle_action(name)
                     break
+        return False
 
     def update(self) -> None:
-        now = pygame.time.get_ticks()
-
-        # Animation frame switching
-        if self.current_action == "idle":
-            if now >= self.next_frame_change_ms:
-                self.frame_index = 1 - self.frame_index
-                self.next_frame_change_ms = now + IDLE_FRAME_MS
-        elif now >= self.next_frame_change_ms:
-            if self.frame_index == 0:
-                self.frame_index = 1
-                self.next_frame_change_ms = now + random.randint(*ACTION_FRAME_MS)
-            else:
-                self.current_action = "idle"
-                self.frame_index = 0
-                self.next_frame_change_ms = now + IDLE_FRAME_MS
-                self.locked = False
-
-        # Stat decay
-        if not self.state.dead and now - self.last_decay_ms >= DECAY_MS:
-            self.state.hunger = clamp(self.state.hunger + DECAY_HUNGER)
-            self.state.happiness = clamp(self.state.happiness + DECAY_HAPPINESS)
-            self.state.love = clamp(self.state.love + DECAY_LOVE)
-            self.last_decay_ms = now
-
-        # Hunger=0 warning (einmal)
-        if not self.state.dead and self.state.hunger <= 0 and not self.hunger_warning_shown:
-            self.say("HUNGRY", 5200)
-            self.hunger_warning_shown = True
-        if not self.state.dead and self.state.hunger > 0:
-            self.hunger_warning_shown = False
-
-        # Death rule: hunger == 0 AND (love red OR happiness red)
-        if not self.state.dead and self.state.hunger <= 0:
-            love_red = self.state.love < 35
-            happy_red = self.state.happiness < 35
-            if love_red or happy_red:
-                self.state.dead = True
-                self.current_action = "idle"
-                self.locked = False
-                self.frame_index = 0
-                self.next_frame_change_ms = now + IDLE_FRAME_MS
-
-                if love_red:
-                    self.say("DEAD_LOVE", 7000)
-                else:
-                    self.say("DEAD_PLAY", 7000)
-
-                robust_save(self.state)
+        now = self.ticks()
+        if self.recorder is not None:
+            self.recorder.tick(now)
+        self.sim.update()
 
-        # Energy regen (dynamisch)
-        self.update_energy()
+        if self.idle_after_ms and not self.power_save and now - self.last_input_ms >= self.idle_after_ms:
+            self.enter_power_save()
 
         # Autosave
         if now - self.last_autosave_ms >= AUTOSAVE_MS:
-            robust_save(self.state)
+            if self.state.version != self.saved_version:
+                self.save()
             self.last_autosave_ms = now
 
-        # Status timeout
-        if now >= self.status_message_until_ms:
-            self.status_message = ""
-
     def draw_bar(self, label: str, value: int, top: int) -> None:
-        label_surface = self.small_font.render(f"{label}: {value}%", True, (240, 240, 240))
+        label_surface = self.text.render(
+            self.small_font, f"{label}: {value}%", (240, 240, 240), backdrop=(self.background(), (20, top))
+        )
         self.screen.blit(label_surface, (20, top))
 
-        bar_rect = pygame.Rect(120, top + 2, 180, 16)
-        pygame.draw.rect(self.screen, (70, 70, 70), bar_rect)
+        # Rahmen + Hintergrund kommen aus dem Background-Layer, nur die Füllung innerhalb
+        bar_rect = bar_rect_for(top)
         fill_width = int((value / 100) * bar_rect.width)
         fill_rect = pygame.Rect(bar_rect.x, bar_rect.y, fill_width, bar_rect.height)
-        pygame.draw.rect(self.screen, color_for_value(value), fill_rect)
-        pygame.draw.rect(self.screen, (200, 200, 200), bar_rect, 1)
+        pygame.draw.rect(self.screen, color_for_value(value), fill_rect.clip(bar_rect.inflate(-2, -2)))
 
-    def draw(self) -> None:
-        self.screen.fill((25, 25, 35))
-
-        action_for_sprite = self.effective_action_for_sprite()
-
-        # ✅ secret idle_3 override
-        if self.use_secret_idle3():
-            sprite_index = 2  # idle_3.png
-        else:
-            sprite_index = self.frame_index
-
-        sprite = self.sprites.frame(self.state.current_phase, action_for_sprite, sprite_index)
+    def draw_sprite(self, sprite: pygame.Surface) -> None:
         self.screen.blit(sprite, (SPRITE_X, SPRITE_Y))
 
+    def draw_info(self) -> None:
         xp_text = "MAX" if self.state.level >= 20 else f"{self.state.xp}/{xp_needed(self.state.level)}"
-        info = self.small_font.render(
+        info = self.text.render(
+            self.small_font,
             f"Level {self.state.level} ({self.state.current_phase})  XP {xp_text}",
-            True,
             (255, 255, 255),
+            backdrop=(self.background(), (12, 22)),
         )
         self.screen.blit(info, (12, 22))
 
-        self.draw_bar("Hunger", self.state.hunger, 220)
-        self.draw_bar("Happiness", self.state.happiness, 252)
-        self.draw_bar("Love", self.state.love, 284)
-        self.draw_bar("Energy", self.state.energy, 316)
-
-        # Dialog bubble
-        if self.status_message:
-            box = pygame.Rect(12, 350, 296, 42)
-            pygame.draw.rect(self.screen, (35, 35, 45), box, border_radius=8)
-            pygame.draw.rect(self.screen, (200, 200, 200), box, 1, border_radius=8)
-            txt = self.small_font.render(self.status_message, True, (240, 240, 240))
-            self.screen.blit(txt, txt.get_rect(center=box.center))
+    def draw_dialog(self) -> None:
+        if not self.sim.status_message:
+            return
+        box = pygame.Rect(12, 350, 296, 42)
+        pygame.draw.rect(self.screen, (35, 35, 45), box, border_radius=8)
+        pygame.draw.rect(self.screen, (200, 200, 200), box, 1, border_radius=8)
+        txt = self.text.render(self.small_font, self.sim.status_message, (240, 240, 240))
+        self.screen.blit(txt, txt.get_rect(center=box.center))
+
+    def draw_frame_stats(self) -> None:
+        # Nicht über den TextCache: die Zahlen ändern sich ständig und würden ihn leeren
+        pygame.draw.rect(self.screen, (10, 10, 15), OVERLAY_RECT)
+        pygame.draw.rect(self.screen, (200, 200, 200), OVERLAY_RECT, 1)
+        rows = [("ms", "p50", "p95", "p99")] + self.overlay_rows
+        for i, row in enumerate(rows):
+            color = (255, 220, 120) if i == 0 else (230, 230, 230)
+            for column, cell in enumerate(row):
+                txt = self.small_font.render(cell, True, color)
+                self.screen.blit(txt, (OVERLAY_RECT.x + 4 + column * 48, OVERLAY_RECT.y + 3 + i * 12))
+
+    def toggle_frame_stats(self) -> None:
+        self.show_frame_stats = not self.show_frame_stats
+        self.overlay_rows = []
+        self.invalidate()
+
+    def maybe_log_frame_stats(self) -> None:
+        now = self.ticks()
+        if now - self.last_frame_summary_ms < FRAME_SUMMARY_MS:
+            return
+        self.last_frame_summary_ms = now
+        summary = "; ".join(
+            f"{phase} {p50:.2f}/{p95:.2f}/{p99:.2f}" for phase, (p50, p95, p99) in self.frame_stats.percentiles().items()
+        )
+        logger.info(
+            "Frame times over the last %s frames (ms p50/p95/p99): %s", len(self.frame_stats.samples["frame"]), summary
+        )
 
-        # Buttons
+    def draw_buttons(self, surface: pygame.Surface) -> None:
         if self.state.dead:
             rect = self.buttons["RESET"]
-            pygame.draw.rect(self.screen, (60, 80, 150), rect, border_radius=6)
-            pygame.draw.rect(self.screen, (220, 220, 220), rect, 2, border_radius=6)
-            txt = self.font.render("RESET (R)", True, (255, 255, 255))
-            self.screen.blit(txt, txt.get_rect(center=rect.center))
+            pygame.draw.rect(surface, (60, 80, 150), rect, border_radius=6)
+            pygame.draw.rect(surface, (220, 220, 220), rect, 2, border_radius=6)
+            txt = self.text.render(self.font, "RESET (R)", (255, 255, 255))
+            surface.blit(txt, txt.get_rect(center=rect.center))
 
             for name in ("FEED", "PLAY", "CUDDLE"):
                 rect = self.buttons[name]
-                pygame.draw.rect(self.screen, (75, 75, 75), rect, border_radius=6)
-                pygame.draw.rect(self.screen, (220, 220, 220), rect, 2, border_radius=6)
-                txt = self.small_font.render(name, True, (170, 170, 170))
-                self.screen.blit(txt, txt.get_rect(center=rect.center))
+                pygame.draw.rect(surface, (75, 75, 75), rect, border_radius=6)
+                pygame.draw.rect(surface, (220, 220, 220), rect, 2, border_radius=6)
+                txt = self.text.render(self.small_font, name, (170, 170, 170))
+                surface.blit(txt, txt.get_rect(center=rect.center))
         else:
             for name in ("FEED", "PLAY", "CUDDLE"):
                 rect = self.buttons[name]
@@ -584,59 +1515,237 @@ class Game:
                 button_color = (75, 75, 75) if disabled else (60, 80, 150)
                 text_color = (170, 170, 170) if disabled else (255, 255, 255)
 
-                pygame.draw.rect(self.screen, button_color, rect, border_radius=6)
-                pygame.draw.rect(self.screen, (220, 220, 220), rect, 2, border_radius=6)
+                pygame.draw.rect(surface, button_color, rect, border_radius=6)
+                pygame.draw.rect(surface, (220, 220, 220), rect, 2, border_radius=6)
 
                 label = f"{name} ({cost})" if cost > 0 else name
-                txt = self.small_font.render(label, True, text_color)
-                self.screen.blit(txt, txt.get_rect(center=rect.center))
+                txt = self.text.render(self.small_font, label, text_color)
+                surface.blit(txt, txt.get_rect(center=rect.center))
 
             rect = self.buttons["RESET"]
-            pygame.draw.rect(self.screen, (75, 75, 75), rect, border_radius=6)
-            pygame.draw.rect(self.screen, (220, 220, 220), rect, 2, border_radius=6)
-            txt = self.small_font.render("RESET", True, (170, 170, 170))
-            self.screen.blit(txt, txt.get_rect(center=rect.center))
+            pygame.draw.rect(surface, (75, 75, 75), rect, border_radius=6)
+            pygame.draw.rect(surface, (220, 220, 220), rect, 2, border_radius=6)
+            txt = self.text.render(self.small_font, "RESET", (170, 170, 170))
+            surface.blit(txt, txt.get_rect(center=rect.center))
 
-        # Power button
-        pygame.draw.rect(self.screen, (120, 40, 40), self.power_button, border_radius=5)
-        ptxt = self.small_font.render("POWER", True, (255, 255, 255))
-        self.screen.blit(ptxt, ptxt.get_rect(center=self.power_button.center))
+    def draw_power(self, surface: pygame.Surface) -> None:
+        pygame.draw.rect(surface, (120, 40, 40), self.power_button, border_radius=5)
+        ptxt = self.text.render(self.small_font, "POWER", (255, 255, 255))
+        surface.blit(ptxt, ptxt.get_rect(center=self.power_button.center))
 
-        pygame.display.flip()
+    def background_key(self) -> tuple:
+        if self.state.dead:
+            return (True, ())
+        disabled = tuple(
+            self.state.energy < int(ACTION_RULES.get(name, {}).get("cost", 0))
+            for name in ("FEED", "PLAY", "CUDDLE")
+        )
+        return (False, disabled)
+
+    def background(self) -> pygame.Surface:
+        """Statischer Layer (Bar-Rahmen, Buttons, POWER), einmal pro Zustand gebaut."""
+        key = self.background_key()
+        surf = self.backgrounds.get(key)
+        if surf is not None:
+            return surf
+
+        surf = pygame.Surface((WIDTH, HEIGHT)).convert()
+        surf.fill(BG_COLOR)
+        for top in BAR_TOPS.values():
+            bar_rect = bar_rect_for(top)
+            pygame.draw.rect(surf, (70, 70, 70), bar_rect)
+            pygame.draw.rect(surf, (200, 200, 200), bar_rect, 1)
+        self.draw_buttons(surf)
+        self.draw_power(surf)
+
+        self.backgrounds[key] = surf
+        return surf
+
+    def regions(self) -> List[Tuple[str, pygame.Rect, tuple, Callable[[], None]]]:
+        """(name, rect, key, painter) je Region; ändert sich key, wird die Region neu gezeichnet."""
+        action_for_sprite = self.effective_action_for_sprite()
+
+        # ✅ secret idle_3 override
+        if self.use_secret_idle3():
+            sprite_index = 2  # idle_3.png
+        else:
+            sprite_index = self.sim.frame_index
+
+        sprite = self.sprites.frame(self.state.current_phase, action_for_sprite, sprite_index)
+
+        regions = [
+            ("sprite", SPRITE_RECT, (sprite,), lambda: self.draw_sprite(sprite)),
+            (
+                "info",
+                INFO_RECT,
+                (self.state.level, self.state.xp),
+                self.draw_info,
+            ),
+        ]
+        for label, top in BAR_TOPS.items():
+            value = getattr(self.state, label.lower())
+            regions.append(
+                (
+                    f"bar:{label}",
+                    pygame.Rect(0, top, WIDTH, 20),
+                    (value,),
+                    lambda label=label, value=value, top=top: self.draw_bar(label, value, top),
+                )
+            )
+
+        regions += [
+            ("dialog", DIALOG_RECT, (self.sim.status_message,), self.draw_dialog),
+            # Buttons stecken komplett im Background-Layer
+            ("buttons", BUTTONS_RECT, self.background_key(), lambda: None),
+        ]
+
+        if self.show_frame_stats:
+            now = self.ticks()
+            if not self.overlay_rows or now - self.overlay_updated_ms >= OVERLAY_REFRESH_MS:
+                self.overlay_rows = self.frame_stats.rows()
+                self.overlay_updated_ms = now
+            regions.append(("overlay", OVERLAY_RECT, tuple(self.overlay_rows), self.draw_frame_stats))
+        return regions
+
+    def invalidate(self) -> None:
+        """Beim nächsten draw() den ganzen Bildschirm neu zeichnen."""
+        self.needs_full_redraw = True
+
+    def draw(self) -> None:
+        regions = self.regions()
+        background = self.background()
+        self.last_flip_s = 0.0
+
+        if self.full_redraw or self.needs_full_redraw:
+            self.screen.blit(background, (0, 0))
+            for name, _rect, key, painter in regions:
+                painter()
+                self.region_keys[name] = key
+            self.needs_full_redraw = False
+            started = time.perf_counter()
+            self.output.flip()
+            self.last_flip_s = time.perf_counter() - started
+            return
+
+        dirty: List[pygame.Rect] = []
+        for name, rect, key, painter in regions:
+            # auch neu, wenn eine schon neu gezeichnete Region darunter liegt (Overlay über dem Sprite)
+            if self.region_keys.get(name) == key and rect.collidelist(dirty) < 0:
+                continue
+            self.region_keys[name] = key
+            self.screen.set_clip(rect)
+            self.screen.blit(background, rect, rect)
+            painter()
+            self.screen.set_clip(None)
+            dirty.append(rect)
+
+        if dirty:
+            started = time.perf_counter()
+            self.output.update(dirty)
+            self.last_flip_s = time.perf_counter() - started
 
     def shutdown_sequence(self) -> None:
         logger.info("Power button pressed: saving and shutting down")
         self.set_status("Saving...", 1200)
-        robust_save(self.state)
+        self.save()
+        self.saver.flush()
 
-        try:
-            subprocess.run(["sync"], check=False)
-        except Exception:
-            pass
+        if os.name != "nt" and self.shutdown_command:
+            import subprocess
 
-        if os.name != "nt":
             try:
-                subprocess.run(["sudo", "shutdown", "-h", "now"], check=False)
+                subprocess.run(self.shutdown_command, check=False)
             except Exception:
                 logger.warning("Shutdown command failed; exiting only.")
         self.running = False
 
+    def wait_for_events(self) -> List[pygame.event.Event]:
+        """Blockiert bis zur nächsten Deadline oder bis Input ankommt."""
+        timeout = self.next_deadline_ms() - pygame.time.get_ticks()
+        timeout = min(MAX_WAIT_MS, timeout)
+        if timeout <= 0:
+            return pygame.event.get()
+
+        event = pygame.event.wait(timeout)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
     def run(self) -> None:
+        if self.loop_mode == "event":
+            # Touch-Bewegungen brauchen wir nicht, sie würden nur aufwecken
+            pygame.event.set_blocked(pygame.MOUSEMOTION)
+
+        perf = time.perf_counter
         while self.running:
-            for event in pygame.event.get():
-                self.handle_event(event)
+            # Im Stromsparmodus schläft auch "fixed" bis zur nächsten Deadline
+            event_driven = self.loop_mode == "event" or self.power_save
+            started = perf()
+            events = self.wait_for_events() if event_driven else pygame.event.get()
+            fetched = perf()
+            self.ticks.set(pygame.time.get_ticks())
+            for event in events:
+                woke = self.handle_event(event)
+                if self.recorder is not None:
+                    self.recorder.event(self.ticks(), event, woke)
+            handled = perf()
             self.update()
+            updated = perf()
             self.draw()
-            self.clock.tick(FPS)
+            drawn = perf()
+            if self.startup is not None:
+                # Warten auf Events ist Schlaf und gehört nicht zur Zeichenzeit
+                self.startup.mark("first wait", fetched)
+                self.startup.mark("first update", updated)
+                self.startup.mark("first draw", drawn - self.last_flip_s)
+                self.startup.mark("first flip", drawn)
+                self.startup.log()
+                self.startup = None
+            if not event_driven:
+                self.clock.tick(FPS)
+            slept = perf()
+
+            # event.wait() ist Schlaf, pygame.event.get() zählt zur Event-Verarbeitung
+            waited = fetched - started if event_driven else 0.0
+            self.frame_stats.record(
+                events=handled - started - waited,
+                update=updated - handled,
+                draw=drawn - updated - self.last_flip_s,
+                flip=self.last_flip_s,
+                sleep=slept - drawn + waited,
+            )
+            self.maybe_log_frame_stats()
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """Alles Regelrelevante, das ein Replay exakt reproduzieren muss."""
+        return {
+            "state": asdict(self.state),
+            "energy_float": self.sim.energy_float,
+            "current_action": self.sim.current_action,
+            "locked": self.sim.locked,
+            "last_decay_ms": self.sim.last_decay_ms,
+        }
 
     def close(self) -> None:
         try:
-            robust_save(self.state)
+            if self.recorder is not None:
+                self.recorder.close(self.ticks(), self.fingerprint())
+                self.recorder = None
+            self.save()
+            self.saver.close()
         finally:
+            if self.metrics is not None:
+                self.metrics.close()
+            if self.backlight is not None:
+                self.backlight.restore()
+            self.output.close()
+            self.sprites.close()
             pygame.quit()
 
 
 def _install_signal_handlers(game: Game) -> None:
+    import signal
+
     def _handler(signum, frame):
         logger.info("Signal %s received, exiting.", signum)
         game.running = False
@@ -648,7 +1757,48 @@ def _install_signal_handlers(game: Game) -> None:
             pass
 
 
+def replay(path: Path) -> int:
+    """Spielt ein Input-Log headless und so schnell wie möglich ab; 1 wenn der Endzustand abweicht."""
+    log = read_input_log(path)
+    ticks = VirtualClock(log.start_ms)
+    game = Game(ReplayBackend(log.state), ticks, log.seed, log.started_at, record_path="", headless=True)
+
+    started = time.perf_counter()
+    try:
+        for kind, at_ms, event in log.records:
+            ticks.set(at_ms)
+            if event is not None:
+                game.handle_event(event)
+            elif kind == INPUT_TICK:
+                game.update()
+            elif kind == INPUT_WAKE:
+                game.wake()
+        result = game.fingerprint()
+    finally:
+        game.close()
+
+    simulated_s = (ticks() - log.start_ms) / 1000
+    logger.info(
+        "Replayed %s records (%.0fs of play) in %.2fs", len(log.records), simulated_s, time.perf_counter() - started
+    )
+    print(json.dumps(result, indent=2))
+    if log.final is None:
+        logger.warning("Log has no end record; nothing to compare against")
+        return 0
+    if result != log.final:
+        for key in result:
+            if result[key] != log.final.get(key):
+                logger.error("Replay diverged in %s: recorded %r, replayed %r", key, log.final.get(key), result[key])
+        return 1
+    logger.info("Replay matches the recorded end state")
+    return 0
+
+
 def main() -> int:
+    if len(sys.argv) == 3 and sys.argv[1] == "--replay":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        return replay(Path(sys.argv[2]))
+
     game = Game()
     _install_signal_handlers(game)
 
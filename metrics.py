@@ -0,0 +1,160 @@
+"""
+Optionaler Metrics-Endpoint (TAMAGO_METRICS) im Prometheus-Textformat: Frame-Zeiten,
+Saves, Sprite-/Text-Cache, aktueller GameState und RSS des Prozesses. Läuft als
+HTTP-Server (TCP oder Unix-Socket) in einem Daemon-Thread und liest nur Zähler, die
+die Hauptschleife ohnehin pflegt; wird von main.py nur importiert, wenn aktiviert.
+"""
+
+import os
+import socketserver
+import threading
+from dataclasses import fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from main import Game, Histogram, SaveStats
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Aktuelles Resident Set (Linux /proc); None, wo es das nicht gibt."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _labels(labels: str, extra: str = "") -> str:
+    joined = ",".join(part for part in (labels, extra) if part)
+    return f"{{{joined}}}" if joined else ""
+
+
+def histogram_lines(name: str, histogram: "Histogram", labels: str = "") -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        le = f'le="{bound}"'
+        lines.append(f"{name}_bucket{_labels(labels, le)} {cumulative}")
+    # count kann zwischen zwei Lesezugriffen weiterlaufen; +Inf darf nie kleiner sein
+    total = max(cumulative, histogram.count)
+    inf = 'le="+Inf"'
+    lines.append(f"{name}_bucket{_labels(labels, inf)} {total}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(labels)} {total}")
+    return lines
+
+
+def render_metrics(game: "Game", save_stats: "SaveStats") -> str:
+    out: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str) -> None:
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+
+    stats = game.frame_stats
+    metric("tamago_frame_phase_seconds", "histogram", "Time per main loop phase; phase=frame is everything but sleep.")
+    for phase, histogram in stats.histograms.items():
+        out += histogram_lines("tamago_frame_phase_seconds", histogram, f'phase="{phase}"')
+    metric("tamago_frames_total", "counter", "Main loop iterations.")
+    out.append(f"tamago_frames_total {stats.frames}")
+
+    metric("tamago_save_seconds", "histogram", "Duration of robust_save (snapshot) and journal appends.")
+    for kind, histogram in save_stats.latency.items():
+        out += histogram_lines("tamago_save_seconds", histogram, f'kind="{kind}"')
+    metric("tamago_save_failures_total", "counter", "Failed snapshot writes and journal appends.")
+    for kind, failures in save_stats.failures.items():
+        out.append(f'tamago_save_failures_total{{kind="{kind}"}} {failures}')
+
+    sprites = game.sprites
+    metric("tamago_sprite_cache_bytes", "gauge", "Pixel memory of all loaded sprite phases.")
+    out.append(f"tamago_sprite_cache_bytes {sprites.memory_bytes}")
+    metric("tamago_sprite_phases_loaded", "gauge", "Sprite phases held in memory.")
+    out.append(f"tamago_sprite_phases_loaded {len(sprites.cache)}")
+    if sprites.disk_cache is not None:
+        metric("tamago_sprite_disk_cache_requests_total", "counter", "Sprite disk cache lookups.")
+        out.append(f'tamago_sprite_disk_cache_requests_total{{result="hit"}} {sprites.disk_cache.hits}')
+        out.append(f'tamago_sprite_disk_cache_requests_total{{result="miss"}} {sprites.disk_cache.misses}')
+
+    metric("tamago_sprite_surfaces", "gauge", "Loaded sprites by blit mode (opaque, colorkey, flattened, alpha).")
+    sprite_modes: Dict[str, int] = {}
+    for mode in list(sprites.surface_modes.values()):
+        sprite_modes[mode] = sprite_modes.get(mode, 0) + 1
+    for mode, count in sorted(sprite_modes.items()):
+        out.append(f'tamago_sprite_surfaces{{mode="{mode}"}} {count}')
+    metric("tamago_text_renders_total", "counter", "Text cache misses by blit mode of the rendered surface.")
+    for mode, count in sorted(dict(game.text.modes).items()):
+        out.append(f'tamago_text_renders_total{{mode="{mode}"}} {count}')
+
+    metric("tamago_text_cache_entries", "gauge", "Rendered text surfaces in the LRU cache.")
+    out.append(f"tamago_text_cache_entries {len(game.text.entries)}")
+    metric("tamago_text_cache_requests_total", "counter", "Text cache lookups.")
+    out.append(f'tamago_text_cache_requests_total{{result="hit"}} {game.text.hits}')
+    out.append(f'tamago_text_cache_requests_total{{result="miss"}} {game.text.misses}')
+
+    state = game.state
+    for field in fields(state):
+        if field.name == "saved_at":
+            continue
+        name = f"tamago_pet_{field.name}"
+        metric(name, "gauge", f"Current GameState.{field.name}.")
+        out.append(f"{name} {int(getattr(state, field.name))}")
+
+    rss = process_rss_bytes()
+    if rss is not None:
+        metric("process_resident_memory_bytes", "gauge", "Resident memory size in bytes.")
+        out.append(f"process_resident_memory_bytes {rss}")
+    return "\n".join(out) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        server = self.server
+        body = render_metrics(server.game, server.save_stats).encode("utf-8")  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        # Scrapes alle paar Sekunden gehören nicht ins Journal
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    """GET /metrics auf "port", "host:port" (Standard-Host 127.0.0.1) oder "unix:/pfad"."""
+
+    def __init__(self, game: "Game", save_stats: "SaveStats", address: str) -> None:
+        if address.startswith("unix:"):
+            path = address[len("unix:"):]
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.server: socketserver.BaseServer = UnixHTTPServer(path, MetricsHandler)
+        else:
+            host, _, port = address.rpartition(":")
+            self.server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), MetricsHandler)
+        self.server.game = game  # type: ignore[attr-defined]
+        self.server.save_stats = save_stats  # type: ignore[attr-defined]
+        self.address = address
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self.address.startswith("unix:"):
+            try:
+                os.unlink(self.address[len("unix:"):])
+            except OSError:
+                pass
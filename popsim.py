@@ -0,0 +1,217 @@
+"""
+Vektorisierter Populations-Simulator fürs Balancing.
+
+Hält N Haustiere als Struct-of-Arrays (level, xp, hunger, happiness, love, energy, dead)
+und wendet dieselben Regeln wie engine.py an (ACTION_RULES, DECAY_*, xp_needed,
+energy_fill_minutes, Death-Rule), nur für alle Tiere gleichzeitig. Ein Schritt sind
+--step-ticks Decay-Ticks mit höchstens einer Aktion pro Tier; die Regen-Rate wird pro
+Schritt einmal bestimmt, der Todeszeitpunkt innerhalb des Schritts dagegen exakt.
+
+    python3 popsim.py --pets 100000 --policy greedy --days 2
+
+Braucht NumPy (sudo apt install python3-numpy).
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+import engine
+
+ACTIONS = ("FEED", "PLAY", "CUDDLE")
+POLICIES = ("idle", "random", "greedy")
+NO_ACTION = len(ACTIONS)
+MAX_LEVEL = 20
+# Für Tiere, die einen Zustand nie erreichen (z.B. Decay >= 0)
+NEVER = np.iinfo(np.int32).max // 4
+
+
+def fill_minutes(hunger: np.ndarray, happiness: np.ndarray, love: np.ndarray) -> np.ndarray:
+    """engine.energy_fill_minutes für ganze Arrays."""
+    def orange(value: np.ndarray) -> np.ndarray:
+        return (value >= engine.ORANGE_MIN) & (value < engine.GREEN_MIN)
+
+    green = engine.GREEN_MIN
+    all_green = (hunger >= green) & (happiness >= green) & (love >= green)
+    orange_count = orange(hunger).astype(np.int8) + orange(happiness) + orange(love)
+    return np.select(
+        [hunger <= 0, hunger < engine.ORANGE_MIN, all_green, orange_count == 1],
+        [60.0, 20.0, 7.5, 10.0],
+        default=12.5,
+    )
+
+
+def first_tick_below(value: np.ndarray, delta: int, threshold: int) -> np.ndarray:
+    """Erster Decay-Tick k, ab dem clamp(value + k * delta) < threshold ist (0 = schon jetzt)."""
+    if delta < 0:
+        ticks = (value - threshold) // -delta + 1
+    else:
+        ticks = np.full(value.shape, NEVER, dtype=np.int32)
+    return np.where(value < threshold, 0, ticks)
+
+
+class Population:
+    def __init__(self, pets: int, seed: Optional[int] = None) -> None:
+        start = engine.GameState()
+        self.rng = np.random.default_rng(seed)
+        self.level = np.full(pets, start.level, dtype=np.int32)
+        self.xp = np.full(pets, start.xp, dtype=np.int32)
+        self.hunger = np.full(pets, start.hunger, dtype=np.int32)
+        self.happiness = np.full(pets, start.happiness, dtype=np.int32)
+        self.love = np.full(pets, start.love, dtype=np.int32)
+        self.energy = np.full(pets, float(start.energy))
+        self.dead = np.zeros(pets, dtype=bool)
+
+        # Ergebnis je Tier in ms, -1 = (noch) nicht erreicht
+        self.death_ms = np.full(pets, -1, dtype=np.int64)
+        self.level20_ms = np.full(pets, -1, dtype=np.int64)
+        self.actions = np.zeros(pets, dtype=np.int32)
+
+        self.xp_table = np.array([engine.xp_needed(level) for level in range(MAX_LEVEL + 1)], dtype=np.int32)
+        # eine Zeile pro Aktion plus eine Null-Zeile für NO_ACTION
+        self.rule_table = {
+            key: np.array([int(engine.ACTION_RULES[name].get(key, 0)) for name in ACTIONS] + [0], dtype=np.int32)
+            for key in ("cost", "hunger", "happiness", "love", "xp")
+        }
+
+    def choose(self, policy: str, act_probability: float) -> np.ndarray:
+        """Index in ACTIONS pro Tier, NO_ACTION = keine Aktion in diesem Schritt."""
+        pets = self.level.shape[0]
+        if policy == "idle":
+            return np.full(pets, NO_ACTION)
+        if policy == "random":
+            choice = self.rng.integers(0, len(ACTIONS), pets)
+            return np.where(self.rng.random(pets) < act_probability, choice, NO_ACTION)
+
+        # greedy: den niedrigsten Wert anheben, sobald einer nicht mehr grün ist
+        hunger, happiness, love = self.hunger, self.happiness, self.love
+        lowest = np.where(
+            (hunger <= happiness) & (hunger <= love), 0, np.where(happiness <= love, 1, 2)
+        )
+        green = engine.GREEN_MIN
+        needs_care = (hunger < green) | (happiness < green) | (love < green)
+        return np.where(needs_care, lowest, NO_ACTION)
+
+    def apply_actions(self, choice: np.ndarray) -> np.ndarray:
+        """Wendet die Aktionen an; liefert die gesperrten ms (Animation) pro Tier."""
+        current_energy = np.floor(self.energy)
+        cost = self.rule_table["cost"][choice]
+        acting = (choice != NO_ACTION) & ~self.dead & (current_energy >= cost)
+
+        self.energy = np.where(acting, np.clip(current_energy - cost, 0, 100), self.energy)
+        for stat in ("hunger", "happiness", "love"):
+            delta = np.where(acting, self.rule_table[stat][choice], 0)
+            setattr(self, stat, np.clip(getattr(self, stat) + delta, 0, 100))
+        self.xp += np.where(acting, self.rule_table["xp"][choice], 0)
+        self.actions += acting
+
+        # apply_leveling für alle
+        while True:
+            leveling = (self.level < MAX_LEVEL) & (self.xp >= self.xp_table[self.level])
+            if not leveling.any():
+                break
+            self.xp -= np.where(leveling, self.xp_table[self.level], 0)
+            self.level += leveling
+
+        # zwei Animations-Frames, während derer keine Energy regeneriert
+        lo, hi = engine.ACTION_FRAME_MS
+        frames = self.rng.integers(lo, hi + 1, (2, choice.shape[0]))
+        return np.where(acting, frames[0] + frames[1], 0)
+
+    def regen(self, step_ms: int, locked_ms: np.ndarray) -> None:
+        alive = ~self.dead
+        rate_per_ms = 100.0 / (fill_minutes(self.hunger, self.happiness, self.love) * 60_000.0)
+        gained = rate_per_ms * np.maximum(step_ms - locked_ms, 0)
+        self.energy = np.where(alive, np.minimum(100.0, self.energy + gained), self.energy)
+
+    def decay(self, ticks: int, now_ms: int) -> None:
+        """ticks Decay-Ticks auf einmal; wer dabei die Death-Rule erfüllt, stirbt am exakten Tick."""
+        alive = ~self.dead
+        hunger_zero = first_tick_below(self.hunger, engine.DECAY_HUNGER, 1)
+        love_red = first_tick_below(self.love, engine.DECAY_LOVE, engine.ORANGE_MIN)
+        happy_red = first_tick_below(self.happiness, engine.DECAY_HAPPINESS, engine.ORANGE_MIN)
+        death_tick = np.maximum(hunger_zero, np.minimum(love_red, happy_red))
+
+        dying = alive & (death_tick <= ticks)
+        applied = np.where(dying, death_tick, ticks)
+        self.hunger = np.clip(self.hunger + engine.DECAY_HUNGER * applied, 0, 100)
+        self.happiness = np.clip(self.happiness + engine.DECAY_HAPPINESS * applied, 0, 100)
+        self.love = np.clip(self.love + engine.DECAY_LOVE * applied, 0, 100)
+
+        self.dead |= dying
+        self.death_ms[dying] = now_ms + death_tick[dying] * engine.DECAY_MS
+
+    def run(self, days: float, policy: str, actions_per_hour: float, step_ticks: int) -> None:
+        step_ms = step_ticks * engine.DECAY_MS
+        act_probability = min(1.0, actions_per_hour * step_ms / 3_600_000)
+        end_ms = int(days * 86_400_000)
+        now_ms = 0
+        while now_ms < end_ms and not self.dead.all():
+            locked_ms = self.apply_actions(self.choose(policy, act_probability))
+            reached = (self.level >= MAX_LEVEL) & (self.level20_ms < 0)
+            self.level20_ms[reached] = now_ms
+
+            # Death-Rule direkt nach der Aktion (PLAY/CUDDLE kosten Hunger)
+            dying = ~self.dead & (self.hunger <= 0) & ((self.love < engine.ORANGE_MIN) | (self.happiness < engine.ORANGE_MIN))
+            self.dead |= dying
+            self.death_ms[dying] = now_ms
+
+            self.regen(step_ms, locked_ms)
+            self.decay(step_ticks, now_ms)
+            now_ms += step_ms
+        self.elapsed_ms = now_ms
+
+
+def percentiles(values_ms: np.ndarray) -> Dict[str, Optional[float]]:
+    hours = values_ms[values_ms >= 0] / 3_600_000
+    if hours.size == 0:
+        return {key: None for key in ("p5", "p25", "p50", "p75", "p95")}
+    p5, p25, p50, p75, p95 = np.percentile(hours, [5, 25, 50, 75, 95])
+    return {"p5": p5, "p25": p25, "p50": p50, "p75": p75, "p95": p95}
+
+
+def summarize(population: Population) -> Dict[str, object]:
+    pets = population.level.shape[0]
+    return {
+        "pets": pets,
+        "simulated_hours": population.elapsed_ms / 3_600_000,
+        "died": float((population.death_ms >= 0).mean()),
+        "reached_level20": float((population.level20_ms >= 0).mean()),
+        "death_hours": percentiles(population.death_ms),
+        "level20_hours": percentiles(population.level20_ms),
+        "mean_level": float(population.level.mean()),
+        "mean_actions": float(population.actions.mean()),
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Vectorized Tamagotchi population simulator")
+    parser.add_argument("--pets", type=int, default=100_000)
+    parser.add_argument("--days", type=float, default=2.0)
+    parser.add_argument("--policy", choices=POLICIES, default="random")
+    parser.add_argument("--actions-per-hour", type=float, default=30.0, help="random policy only")
+    parser.add_argument("--step-ticks", type=int, default=6, help="decay ticks per simulation step")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="write the summary as JSON to this path")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    population = Population(args.pets, args.seed)
+    population.run(args.days, args.policy, args.actions_per_hour, max(1, args.step_ticks))
+    summary = summarize(population)
+    summary["wall_seconds"] = time.perf_counter() - started
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+"""
+Monte-Carlo-Sweep über Regel-Parameter mit engine.Simulation.
+
+Jeder Gitterpunkt (Kombination der --param-Werte) simuliert --pets Haustiere mit einer
+Spieler-Policy und schreibt eine Zusammenfassung als CSV-Zeile, sobald er fertig ist.
+Die Punkte laufen parallel in einem ProcessPoolExecutor (Standard: alle Kerne). Ein
+abgebrochener Sweep wird mit demselben Aufruf fortgesetzt: Punkte, die schon in der
+CSV stehen, werden übersprungen. Die Lauf-Einstellungen stehen daneben in <out>.json;
+weichen sie beim Fortsetzen ab, bricht der Sweep ab, statt Zeilen zu mischen.
+
+    python3 sweep.py --out sweep.csv --param FEED.cost=1,2,4 --param PLAY.xp=10,14,20 \\
+        --param DECAY_MS=5000,10000 --param GREEN_MIN=60,70 --param ORANGE_MIN=30,35
+
+Parameter: <AKTION>.<feld> aus ACTION_RULES (cost, hunger, happiness, love, xp),
+DECAY_MS, GREEN_MIN, ORANGE_MIN (bar_color-Schwellen).
+"""
+
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import engine
+
+POLICIES = ("idle", "random", "greedy")
+MAX_LEVEL = 20
+SCALAR_PARAMS = ("DECAY_MS", "GREEN_MIN", "ORANGE_MIN")
+RULE_FIELDS = ("cost", "hunger", "happiness", "love", "xp")
+SUMMARY_COLUMNS = [
+    "died",
+    "death_hours_p50",
+    "death_hours_p95",
+    "reached_level20",
+    "level20_hours_p50",
+    "level20_hours_p95",
+    "mean_level",
+    "seconds",
+]
+
+# Ausgangswerte der Engine; jeder Punkt setzt seine Parameter auf dieser Basis
+_DEFAULT_RULES = copy.deepcopy(engine.ACTION_RULES)
+_DEFAULT_SCALARS = {name: getattr(engine, name) for name in SCALAR_PARAMS}
+
+Point = Tuple[Tuple[str, int], ...]
+
+
+def parse_param(spec: str) -> Tuple[str, List[int]]:
+    """'FEED.cost=1,2,4' -> ('FEED.cost', [1, 2, 4])"""
+    name, sep, values = spec.partition("=")
+    name = name.strip()
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=v1,v2,...: {spec!r}")
+    if "." in name:
+        action, field = name.split(".", 1)
+        if action not in engine.ACTION_RULES or field not in RULE_FIELDS:
+            raise argparse.ArgumentTypeError(f"unknown rule parameter: {name!r}")
+    elif name not in SCALAR_PARAMS:
+        raise argparse.ArgumentTypeError(f"unknown parameter: {name!r}")
+    try:
+        return name, [int(v) for v in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"values must be integers: {spec!r}") from None
+
+
+def grid(params: List[Tuple[str, List[int]]]) -> Iterator[Point]:
+    names = [name for name, _ in params]
+    for values in itertools.product(*(values for _, values in params)):
+        yield tuple(zip(names, values))
+
+
+def point_key(point: Point) -> str:
+    return ";".join(f"{name}={value}" for name, value in point)
+
+
+def apply_point(point: Point) -> None:
+    """Setzt die Regeln der Engine (im Worker-Prozess) auf Standard + die Werte des Punkts."""
+    rules = copy.deepcopy(_DEFAULT_RULES)
+    scalars = dict(_DEFAULT_SCALARS)
+    for name, value in point:
+        if "." in name:
+            action, field = name.split(".", 1)
+            rules[action][field] = value
+        else:
+            scalars[name] = value
+    engine.ACTION_RULES = rules
+    for name, value in scalars.items():
+        setattr(engine, name, value)
+
+
+def choose_action(policy: str, state: engine.GameState, rng: random.Random, act_probability: float) -> Optional[str]:
+    if policy == "random":
+        return rng.choice(("FEED", "PLAY", "CUDDLE")) if rng.random() < act_probability else None
+    if policy == "greedy":
+        stats = {"FEED": state.hunger, "PLAY": state.happiness, "CUDDLE": state.love}
+        action = min(stats, key=stats.__getitem__)
+        return action if stats[action] < engine.GREEN_MIN else None
+    return None
+
+
+def simulate_pet(
+    policy: str, rng: random.Random, hours: float, step_ms: int, actions_per_hour: float
+) -> Tuple[Optional[int], Optional[int], int]:
+    """Ein Haustier bis zum Tod oder Horizont; (death_ms, level20_ms, level)."""
+    clock = engine.VirtualClock()
+    deaths: List[int] = []
+
+    def on_event(kind: int, arg: int) -> None:
+        if kind == engine.EVENT_DEATH:
+            deaths.append(clock())
+
+    sim = engine.Simulation(clock=clock, rng=rng, wall_clock=lambda: 0.0, on_event=on_event)
+    act_probability = min(1.0, actions_per_hour * step_ms / 3_600_000)
+    level20_ms = None
+    end_ms = int(hours * 3_600_000)
+    while clock() < end_ms and not deaths:
+        action = choose_action(policy, sim.state, rng, act_probability)
+        if action is not None:
+            sim.handle_action(action)
+        if level20_ms is None and sim.state.level >= MAX_LEVEL:
+            level20_ms = clock()
+        sim.run_until(min(end_ms, clock() + step_ms))
+    return (deaths[0] if deaths else None), level20_ms, sim.state.level
+
+
+def _hours_percentile(values_ms: List[int], q: int) -> Optional[float]:
+    if not values_ms:
+        return None
+    if len(values_ms) == 1:
+        return values_ms[0] / 3_600_000
+    return statistics.quantiles(values_ms, n=100, method="inclusive")[q - 1] / 3_600_000
+
+
+def evaluate_point(point: Point, args: argparse.Namespace) -> Dict[str, object]:
+    """Läuft im Worker: Parameter setzen, --pets Haustiere simulieren, zusammenfassen."""
+    started = time.perf_counter()
+    apply_point(point)
+    key = point_key(point)
+    deaths, level20s, levels = [], [], []
+    for pet in range(args.pets):
+        # reproduzierbar pro (seed, Punkt, Haustier), unabhängig von der Worker-Verteilung
+        rng = random.Random(f"{args.seed}:{key}:{pet}")
+        death_ms, level20_ms, level = simulate_pet(
+            args.policy, rng, args.hours, args.step_ticks * engine.DECAY_MS, args.actions_per_hour
+        )
+        if death_ms is not None:
+            deaths.append(death_ms)
+        if level20_ms is not None:
+            level20s.append(level20_ms)
+        levels.append(level)
+
+    row: Dict[str, object] = {"point": key}
+    row.update(dict(point))
+    row.update(
+        died=len(deaths) / args.pets,
+        death_hours_p50=_hours_percentile(deaths, 50),
+        death_hours_p95=_hours_percentile(deaths, 95),
+        reached_level20=len(level20s) / args.pets,
+        level20_hours_p50=_hours_percentile(level20s, 50),
+        level20_hours_p95=_hours_percentile(level20s, 95),
+        mean_level=statistics.fmean(levels),
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    return row
+
+
+def completed_points(path: Path) -> Set[str]:
+    """Punkte, die schon in der CSV stehen; eine halb geschriebene letzte Zeile wird abgeschnitten."""
+    if not path.exists():
+        return set()
+    data = path.read_bytes()
+    if data and not data.endswith(b"\n"):
+        with open(path, "r+b") as fh:
+            fh.truncate(data.rfind(b"\n") + 1)
+    with open(path, newline="", encoding="utf-8") as fh:
+        return {row["point"] for row in csv.DictReader(fh) if row.get("point")}
+
+
+def run_config(args: argparse.Namespace) -> Dict[str, Any]:
+    """Alles außer den Gitterwerten, wovon die Zeilen abhängen; muss beim Fortsetzen gleich sein."""
+    return {
+        "params": [name for name, _ in args.param],
+        "pets": args.pets,
+        "hours": args.hours,
+        "policy": args.policy,
+        "actions_per_hour": args.actions_per_hour,
+        "step_ticks": args.step_ticks,
+        "seed": args.seed,
+    }
+
+
+def config_path(out: Path) -> Path:
+    return out.with_name(out.name + ".json")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Monte Carlo sweep over Tamagotchi rule parameters")
+    parser.add_argument("--param", type=parse_param, action="append", required=True,
+                        help="NAME=v1,v2,... (FEED.cost, PLAY.xp, DECAY_MS, GREEN_MIN, ORANGE_MIN, ...)")
+    parser.add_argument("--out", type=Path, required=True, help="CSV file; resumed if it exists")
+    parser.add_argument("--pets", type=int, default=50, help="pets per grid point")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--policy", choices=POLICIES, default="random")
+    parser.add_argument("--actions-per-hour", type=float, default=30.0, help="random policy only")
+    parser.add_argument("--step-ticks", type=int, default=6, help="decay ticks between policy decisions")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    names = [name for name, _ in args.param]
+    if len(set(names)) != len(names):
+        parser.error("each parameter may only be given once")
+
+    done = completed_points(args.out)
+    config = run_config(args)
+    sidecar = config_path(args.out)
+    if done:
+        try:
+            stored = json.loads(sidecar.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            parser.error(f"{args.out} has results but no readable run config {sidecar}; refusing to resume")
+        changed = [key for key in config if stored.get(key) != config[key]]
+        if changed:
+            details = ", ".join(f"{key}: {stored.get(key)!r} -> {config[key]!r}" for key in changed)
+            parser.error(f"{args.out} was written with other settings ({details}); use a new --out")
+    else:
+        sidecar.write_text(json.dumps(config, indent=2) + "\n", encoding="utf-8")
+
+    todo = [point for point in grid(args.param) if point_key(point) not in done]
+    total = len(done) + len(todo)
+    print(f"{len(todo)} of {total} grid points to run ({len(done)} already in {args.out})", file=sys.stderr)
+    if not todo:
+        return 0
+
+    columns = ["point"] + names + SUMMARY_COLUMNS
+    write_header = not args.out.exists() or args.out.stat().st_size == 0
+    with open(args.out, "a", newline="", encoding="utf-8") as fh, ProcessPoolExecutor(args.workers) as pool:
+        writer = csv.DictWriter(fh, fieldnames=columns)
+        if write_header:
+            writer.writeheader()
+
+        # nur ein paar Punkte pro Worker in der Queue, damit Ctrl+C nicht erst das ganze Gitter abarbeitet
+        pending = iter(todo)
+        running = set()
+        finished = len(done)
+        while True:
+            for point in itertools.islice(pending, max(0, 2 * args.workers - len(running))):
+                running.add(pool.submit(evaluate_point, point, args))
+            if not running:
+                break
+            ready, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in ready:
+                row = future.result()
+                writer.writerow(row)
+                fh.flush()
+                finished += 1
+                print(f"[{finished}/{total}] {row['point']} died={row['died']:.2f} "
+                      f"level20={row['reached_level20']:.2f} ({row['seconds']}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except KeyboardInterrupt:
+        print("interrupted; run the same command again to resume", file=sys.stderr)
+        raise SystemExit(130)